@@ -0,0 +1,158 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+# Number of input pairs grouped together before results are written
+CHUNK = 10000
+
+# Number of sources handed to a worker process at a time
+TASK_SIZE = 16
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python batch.py directory [pairs.csv|-] [workers]")
+    directory = sys.argv[1]
+    pairs = sys.argv[2] if len(sys.argv) >= 3 else "-"
+    workers = int(sys.argv[3]) if len(sys.argv) == 4 else 1
+
+    # Load data once for every query
+    degrees.load_data(directory)
+
+    # Forked workers share the loaded graph copy-on-write; spawned ones
+    # memory-map the same snapshot
+    pool = None
+    if workers > 1:
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        pool = context.Pool(workers, initializer=init_worker, initargs=(directory,))
+
+    try:
+        if pairs == "-":
+            run_batch(sys.stdin, sys.stdout, pool)
+        else:
+            with open(pairs, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def init_worker(directory):
+    """
+    Load data in a worker process unless it was inherited from the parent.
+    """
+    if degrees.graph is None:
+        degrees.load_data(directory)
+
+
+def run_batch(lines, out, pool=None):
+    """
+    Answer every source, target pair read from `lines`, writing one JSON
+    result per pair to `out` in input order.
+
+    Each line holds a source and a target separated by a comma or a tab,
+    given either as person IDs or as unambiguous names. If `pool` is
+    given, queries with different sources run in its worker processes.
+    """
+    rows = (parse_line(line) for line in lines if line.strip())
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK))
+        if not chunk:
+            break
+        for result in answer_chunk(chunk, pool):
+            out.write(json.dumps(result) + "\n")
+        out.flush()
+
+
+def parse_line(line):
+    """
+    Returns the fields of a tab-separated line, or of a CSV line
+    if it holds no tabs.
+    """
+    line = line.rstrip("\r\n")
+    if "\t" in line:
+        return line.split("\t")
+    return next(csv.reader([line]))
+
+
+def answer_chunk(chunk, pool=None):
+    """
+    Returns the results for a list of [source, target] rows, sharing one
+    search between all the rows with the same source.
+    """
+    queries = [resolve_row(row) for row in chunk]
+
+    targets = {}
+    for source, target in queries:
+        if source is not None and target is not None:
+            targets.setdefault(source, []).append(target)
+
+    if pool is None:
+        found = map(paths_from, targets.items())
+    else:
+        found = pool.imap(paths_from, targets.items(), TASK_SIZE)
+    paths = dict(zip(targets, found))
+
+    return [
+        result_for(row, source, target, paths.get(source, {}).get(target))
+        for row, (source, target) in zip(chunk, queries)
+    ]
+
+
+def paths_from(item):
+    """
+    Returns the shortest paths for a (source, targets) item.
+    """
+    source, source_targets = item
+    return degrees.shortest_paths(source, source_targets)
+
+
+def resolve_row(row):
+    """
+    Returns the (source, target) person IDs named by a row,
+    with None for any that cannot be resolved.
+    """
+    if len(row) != 2:
+        return None, None
+    return resolve(row[0]), resolve(row[1])
+
+
+def resolve(value):
+    """
+    Returns the person ID for a person ID or an unambiguous name, or None.
+    """
+    value = value.strip()
+    if value in degrees.people:
+        return value
+    person_ids = degrees.names.get(value.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
+
+def result_for(row, source, target, path):
+    """
+    Returns the JSON-ready result of one query.
+    """
+    result = {"source": row[0] if row else None, "target": row[1] if len(row) > 1 else None}
+    if source is None or target is None:
+        result["error"] = "Person not found."
+    elif path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [[movie_id, person_id] for movie_id, person_id in path]
+    return result
+
+
+if __name__ == "__main__":
+    main()
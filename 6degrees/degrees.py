@@ -1,8 +1,20 @@
-import csv
+import heapq
 import sys
 
+from graph import MovieView, NameView, PeopleView, load_graph
+from landmarks import LandmarkIndex
+from lookup import NameIndex
 from util import Node, StackFrontier, QueueFrontier
 
+# Compact store of every person, movie and star edge
+graph = None
+
+# Optional distances from landmark people, if an index has been built
+landmarks = None
+
+# Prefix and typo-tolerant name search over the loaded graph
+name_index = None
+
 # Maps names to a set of corresponding person_ids
 names = {}
 
@@ -13,43 +25,21 @@ people = {}
 movies = {}
 
 
-def load_data(directory):
+def load_data(directory, cache=True):
     """
     Load data from CSV files into memory.
+
+    Unless `cache` is False, the parsed data is also saved as a binary
+    snapshot next to the CSV files and memory-mapped on later runs.
+    A landmark index built by landmarks.py is loaded too, if current.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global graph, landmarks, name_index, names, people, movies
+    graph = load_graph(directory, cache)
+    landmarks = LandmarkIndex.load(graph, directory)
+    name_index = NameIndex(graph)
+    names = NameView(graph)
+    people = PeopleView(graph)
+    movies = MovieView(graph)
 
 
 def main():
@@ -69,6 +59,13 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
+    if landmarks is not None:
+        bounds = landmarks.estimate(source, target)
+        if bounds is None:
+            print("Estimate: not connected.")
+        elif bounds[1] is not None:
+            print(f"Estimate: {bounds[0]} to {bounds[1]} degrees of separation.")
+
     path = shortest_path(source, target)
 
     if path is None:
@@ -84,14 +81,23 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=True, index=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    By default the search grows from both the source and the target
+    and meets in the middle; pass `bidirectional=False` to expand a
+    single breadth-first frontier from the source instead, or a
+    landmark `index` to run an A* search guided by its bounds.
     """
-    
+    if index is not None:
+        return landmark_shortest_path(source, target, index)
+    if bidirectional:
+        return bidirectional_shortest_path(source, target)
+
     source = Node(source, None, None)
     frontier = QueueFrontier()
     explored = set()
@@ -122,13 +128,215 @@ def shortest_path(source, target):
         source = source.parent
     return path
 
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both ends at once.
+
+    Each side records, for every person it reaches, the movie and the
+    person it was reached through, and which movies it has already
+    scanned. The smaller side is expanded one whole layer at a time,
+    and the first person reached by both sides joins a shortest path.
+
+    If no possible path, returns None. People in different connected
+    components are answered without searching.
+    """
+    if source == target:
+        return []
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None or not graph.connected(source, target):
+        return None
+
+    forward = {source: None}
+    backward = {target: None}
+    forward_movies = set()
+    backward_movies = set()
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meeting = expand_layer(forward_layer, forward, backward, forward_movies)
+        else:
+            backward_layer, meeting = expand_layer(backward_layer, backward, forward, backward_movies)
+        if meeting is not None:
+            return [
+                (graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in join_paths(meeting, forward, backward)
+            ]
+
+    return None
+
+
+def landmark_shortest_path(source, target, index):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using A* search with
+    landmark lower bounds as the heuristic.
+
+    People the landmarks prove cannot reach the target are never
+    queued. If no possible path, returns None.
+    """
+    if source == target:
+        return []
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None or not graph.connected(source, target):
+        return None
+    lower_bound = index.heuristic(target)
+    estimate = lower_bound(source)
+    if estimate is None:
+        return None
+
+    # Queue entries are (estimated length, -distance, person), so ties
+    # go to the person furthest along
+    distance = {source: 0}
+    parents = {source: None}
+    queue = [(estimate, 0, source)]
+    while queue:
+        _, steps, person = heapq.heappop(queue)
+        steps = -steps
+        if person == target:
+            return [
+                (graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in join_paths(target, parents, {target: None})
+            ]
+        if steps > distance[person]:
+            continue
+        for movie, neighbor in graph.costars(person):
+            if steps + 1 >= distance.get(neighbor, steps + 2):
+                continue
+            estimate = lower_bound(neighbor)
+            if estimate is None:
+                continue
+            distance[neighbor] = steps + 1
+            parents[neighbor] = (movie, person)
+            heapq.heappush(queue, (steps + 1 + estimate, -(steps + 1), neighbor))
+    return None
+
+
+def expand_layer(layer, visited, other, scanned):
+    """
+    Expands every person index in `layer`, recording how each newly
+    reached person was found in `visited`.
+
+    The search runs over the person-movie bipartite graph: a movie in
+    `scanned` already had its cast reached from an earlier or equal
+    layer, so it is skipped, and each movie's cast is read at most once.
+
+    Returns the next layer and the first person also present in `other`,
+    or None if the two searches have not met yet.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    next_layer = []
+    for person in layer:
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            if movie in scanned:
+                continue
+            scanned.add(movie)
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_people[j]
+                if neighbor in visited:
+                    continue
+                visited[neighbor] = (movie, person)
+                if neighbor in other:
+                    return next_layer, neighbor
+                next_layer.append(neighbor)
+    return next_layer, None
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Returns the (movie, person) path through `meeting`, given the
+    parent links recorded by the forward and backward searches.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, next_id = backward[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+    return path
+
+
+def shortest_paths(source, targets):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest list of
+    (movie_id, person_id) pairs that connect the source to it, or to None
+    if there is no possible path.
+
+    The search tree grown from the source is kept between targets, so
+    later targets usually meet it after a few backward layers.
+    """
+    source_id = source
+    source = graph.person_index(source_id)
+    wanted = {}
+    paths = {}
+    for target_id in targets:
+        target = graph.person_index(target_id)
+        if target_id == source_id:
+            paths[target_id] = []
+        elif source is None or target is None or not graph.connected(source, target):
+            paths[target_id] = None
+        else:
+            wanted.setdefault(target, []).append(target_id)
+
+    forward = {source: None}
+    forward_movies = set()
+    forward_layer = [source]
+    for target, target_ids in wanted.items():
+        backward = {target: None}
+        backward_movies = set()
+        backward_layer = [target]
+        meeting = target if target in forward else None
+        while meeting is None and forward_layer and backward_layer:
+            if len(forward_layer) <= len(backward_layer):
+                # Always finish the layer so the tree stays reusable
+                forward_layer, _ = expand_layer(forward_layer, forward, (), forward_movies)
+                meeting = next((person for person in forward_layer if person in backward), None)
+            else:
+                backward_layer, meeting = expand_layer(backward_layer, backward, forward, backward_movies)
+
+        if meeting is None:
+            path = None
+        else:
+            path = [
+                (graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in join_paths(meeting, forward, backward)
+            ]
+        for target_id in target_ids:
+            paths[target_id] = path
+    return paths
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    Ambiguous names are listed with the most prolific person first;
+    unknown names get a few close matches suggested.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [candidate["id"] for candidate in name_index.matches(name)]
     if len(person_ids) == 0:
+        suggestions = name_index.candidates(name, limit=5)
+        if suggestions:
+            print("Did you mean: " + ", ".join(candidate["name"] for candidate in suggestions) + "?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -153,12 +361,11 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    person = graph.person_index(person_id)
+    return {
+        (graph.movie_ids[movie], graph.person_ids[neighbor])
+        for movie, neighbor in graph.costars(person)
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,573 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+# Number of component sizes listed by main
+COMPONENTS = 10
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python graph.py directory")
+    graph = load_graph(sys.argv[1])
+    print(f"{graph.person_count()} people, {graph.movie_count()} movies, "
+          f"{len(graph.person_movies)} star edges.")
+    sizes = graph.component_sizes
+    print(f"{len(sizes)} connected components. Largest:")
+    for size in sizes[:COMPONENTS]:
+        print(f"  {size}")
+
+
+class StringTable():
+    """
+    Read-only sequence of strings packed into a single UTF-8 buffer,
+    with `offsets[i]:offsets[i + 1]` spanning the i-th string.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        return cls(bytes(data), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Graph():
+    """
+    Compact store of people, movies and who starred in what.
+
+    People and movies are numbered densely by sorted ID. Star edges are
+    kept in both directions as compressed sparse rows: the movies of
+    person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are
+    `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 name_keys, name_order, trie_children, trie_starts, trie_ends, trie_depths,
+                 trie_labels, name_leaders, components, component_sizes):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Lowercase names in sorted order, and the person each belongs to
+        self.name_keys = name_keys
+        self.name_order = name_order
+
+        # Radix trie over `name_keys`, as built by `name_trie`
+        self.trie_children = trie_children
+        self.trie_starts = trie_starts
+        self.trie_ends = trie_ends
+        self.trie_depths = trie_depths
+        self.trie_labels = trie_labels
+
+        # Segment tree over `name_keys`, as built by `movie_leaders`
+        self.name_leaders = name_leaders
+
+        # Connected component of each person, and the size of each component
+        self.components = components
+        self.component_sizes = component_sizes
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Build a graph from the people, movies and stars CSV files
+        in `directory`.
+        """
+        people = read_rows(f"{directory}/people.csv", ("id", "name", "birth"))
+        people.sort()
+        movies = read_rows(f"{directory}/movies.csv", ("id", "title", "year"))
+        movies.sort()
+        person_index = {row[0]: i for i, row in enumerate(people)}
+        movie_index = {row[0]: i for i, row in enumerate(movies)}
+
+        # Encode each edge as one integer so duplicates collapse and
+        # sorting groups the edges by person
+        edges = set()
+        n_movies = len(movies)
+        for person_id, movie_id in read_rows(f"{directory}/stars.csv", ("person_id", "movie_id")):
+            try:
+                edges.add(person_index[person_id] * n_movies + movie_index[movie_id])
+            except KeyError:
+                pass
+        del person_index, movie_index
+        edges = sorted(edges)
+
+        person_movies = array("i", (edge % n_movies for edge in edges))
+        person_offsets = offsets_for((edge // n_movies for edge in edges), len(people))
+        movie_offsets = offsets_for(person_movies, n_movies)
+
+        # Counting sort the same edges by movie
+        movie_people = array("i", bytes(4 * len(edges)))
+        cursor = array("q", movie_offsets)
+        for person in range(len(people)):
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                movie_people[cursor[movie]] = person
+                cursor[movie] += 1
+
+        components, component_sizes = label_components(len(people), movie_offsets, movie_people)
+
+        lowered = [row[1].lower() for row in people]
+        name_order = array("i", sorted(range(len(people)), key=lowered.__getitem__))
+        sorted_names = [lowered[i] for i in name_order]
+        name_keys = StringTable.from_strings(sorted_names)
+        trie = name_trie(sorted_names)
+        name_leaders = movie_leaders(name_order, person_offsets)
+
+        return cls(
+            StringTable.from_strings(row[0] for row in people),
+            StringTable.from_strings(row[1] for row in people),
+            StringTable.from_strings(row[2] for row in people),
+            StringTable.from_strings(row[0] for row in movies),
+            StringTable.from_strings(row[1] for row in movies),
+            StringTable.from_strings(row[2] for row in movies),
+            person_offsets, person_movies, movie_offsets, movie_people,
+            name_keys, name_order, *trie, name_leaders, components, component_sizes
+        )
+
+    def person_count(self):
+        return len(self.person_ids)
+
+    def movie_count(self):
+        return len(self.movie_ids)
+
+    def connected(self, source, target):
+        """
+        Returns whether two person indices are linked by any path.
+        """
+        return self.components[source] == self.components[target]
+
+    def component_size(self, person):
+        """
+        Returns the number of people connected to a person index,
+        including themselves.
+        """
+        return self.component_sizes[self.components[person]]
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of `person_id`, or None if unknown.
+        """
+        return find(self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of `movie_id`, or None if unknown.
+        """
+        return find(self.movie_ids, movie_id)
+
+    def people_named(self, name):
+        """
+        Returns the indices of every person whose name matches `name`,
+        ignoring case.
+        """
+        key = name.lower()
+        start = bisect_left(self.name_keys, key)
+        end = bisect_right(self.name_keys, key, start)
+        return [self.name_order[i] for i in range(start, end)]
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies `person` starred in.
+        """
+        person_movies = self.person_movies
+        return [person_movies[i] for i in range(self.person_offsets[person], self.person_offsets[person + 1])]
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in `movie`.
+        """
+        movie_people = self.movie_people
+        return [movie_people[i] for i in range(self.movie_offsets[movie], self.movie_offsets[movie + 1])]
+
+    def costars(self, person):
+        """
+        Yields (movie, person) index pairs for everyone who starred
+        with `person`, including `person` themselves.
+        """
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for i in range(self.person_offsets[person], self.person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[j]
+
+
+# Snapshot layout: a header holding the magic, version, byte order and
+# CSV stamp, then a (typecode, offset, length) entry for every array
+# backing the graph, then the arrays themselves aligned to 8 bytes
+SNAPSHOT_NAME = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 3
+SNAPSHOT_HEADER = struct.Struct("<8sI1s3x6q")
+SNAPSHOT_SECTION = struct.Struct("<1s7xqq")
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+# Graph attributes in snapshot order, and which of them are string tables
+FIELDS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+    "person_offsets", "person_movies", "movie_offsets", "movie_people",
+    "name_keys", "name_order", "trie_children", "trie_starts", "trie_ends", "trie_depths",
+    "trie_labels", "name_leaders", "components", "component_sizes"
+)
+STRING_FIELDS = {
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years", "name_keys"
+}
+
+
+def load_graph(directory, cache=True):
+    """
+    Returns the graph for the CSV files in `directory`.
+
+    With `cache`, a binary snapshot is kept next to the CSV files and
+    memory-mapped on later runs. It is rebuilt whenever its version or
+    the size or modification time of any CSV file changes.
+    """
+    if not cache:
+        return Graph.from_csv(directory)
+
+    filename = os.path.join(directory, SNAPSHOT_NAME)
+    stamp = csv_stamp(directory)
+    graph = read_snapshot(filename, stamp)
+    if graph is None:
+        graph = Graph.from_csv(directory)
+        try:
+            write_snapshot(graph, filename, stamp)
+        except OSError:
+            pass
+    return graph
+
+
+def csv_stamp(directory):
+    """
+    Returns the modification time and size of each CSV file, flattened.
+    """
+    stamp = []
+    for name in CSV_FILES:
+        info = os.stat(os.path.join(directory, name))
+        stamp += [info.st_mtime_ns, info.st_size]
+    return tuple(stamp)
+
+
+def write_snapshot(graph, filename, stamp):
+    """
+    Writes `graph` to a snapshot file, replacing any previous one atomically.
+    """
+    arrays = []
+    for field in FIELDS:
+        value = getattr(graph, field)
+        if field in STRING_FIELDS:
+            arrays += [value.data, value.offsets]
+        else:
+            arrays.append(value)
+
+    sections = []
+    position = SNAPSHOT_HEADER.size + SNAPSHOT_SECTION.size * len(arrays)
+    for values in arrays:
+        view = memoryview(values)
+        position += -position % 8
+        sections.append((view.format.encode(), position, view.nbytes))
+        position += view.nbytes
+
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder[0].encode(), *stamp
+            ))
+            for section in sections:
+                f.write(SNAPSHOT_SECTION.pack(*section))
+            for values, (_, offset, _) in zip(arrays, sections):
+                f.write(bytes(offset - f.tell()))
+                f.write(memoryview(values))
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, filename)
+
+
+def read_snapshot(filename, stamp):
+    """
+    Returns the graph memory-mapped from a snapshot file,
+    or None if it is missing, stale or damaged.
+    """
+    try:
+        with open(filename, "rb") as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        magic, version, byteorder, *found = SNAPSHOT_HEADER.unpack_from(view)
+    except (OSError, ValueError, struct.error):
+        return None
+    if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or
+            byteorder != sys.byteorder[0].encode() or tuple(found) != stamp):
+        return None
+
+    position = SNAPSHOT_HEADER.size
+
+    def next_array():
+        nonlocal position
+        typecode, offset, length = SNAPSHOT_SECTION.unpack_from(view, position)
+        position += SNAPSHOT_SECTION.size
+
+        # A file cut short can still hold whole items, so every section
+        # must lie inside it rather than merely cast cleanly
+        typecode = typecode.decode()
+        if offset < 0 or length < 0 or offset + length > len(view) or length % array(typecode).itemsize:
+            raise ValueError("snapshot section is out of bounds")
+        return view[offset:offset + length].cast(typecode)
+
+    values = []
+    try:
+        for field in FIELDS:
+            if field in STRING_FIELDS:
+                values.append(StringTable(next_array(), next_array()))
+            else:
+                values.append(next_array())
+    except (ValueError, TypeError, UnicodeDecodeError, struct.error):
+        return None
+    return Graph(*values)
+
+
+def label_components(n_people, movie_offsets, movie_people):
+    """
+    Returns the connected component of each of `n_people` and the size
+    of each component, found by union-find over every movie's cast.
+
+    Components are numbered from largest to smallest.
+    """
+    parent = array("i", range(n_people))
+
+    def root(person):
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+        if end - start < 2:
+            continue
+        first = root(movie_people[start])
+        for i in range(start + 1, end):
+            other = root(movie_people[i])
+            if other != first:
+                parent[other] = first
+
+    roots = array("i", (root(person) for person in range(n_people)))
+    sizes = {}
+    for person_root in roots:
+        sizes[person_root] = sizes.get(person_root, 0) + 1
+    numbering = {
+        person_root: number
+        for number, person_root in enumerate(sorted(sizes, key=lambda r: (-sizes[r], r)))
+    }
+    components = array("i", (numbering[person_root] for person_root in roots))
+    component_sizes = array("q", sorted(sizes.values(), reverse=True))
+    return components, component_sizes
+
+
+def name_trie(keys):
+    """
+    Returns arrays (children, starts, ends, depths, labels) describing a
+    radix trie over the sorted strings `keys`.
+
+    Node 0 is the root. Node n stands for the prefix of length
+    `depths[n]` shared by `keys[starts[n]:ends[n]]`, of which those
+    exactly that long come first. Its children are the nodes from
+    `children[n]` to `children[n + 1]`, in key order, and chains of
+    single children are merged into one node, so `labels[n]` holds the
+    code point of the first character on the edge into node n. Nodes
+    are numbered breadth first, so every node's children are contiguous
+    and sorted by label.
+    """
+    children = array("i", [1])
+    starts = array("i", [0])
+    ends = array("i", [len(keys)])
+    depths = array("i", [0])
+    labels = array("i", [0])
+    node = 0
+    while node < len(starts):
+        start, end, depth = starts[node], ends[node], depths[node]
+        prefix = keys[start][:depth]
+        i = bisect_right(keys, prefix, start, end)
+        while i < end:
+            label = ord(keys[i][depth])
+            following = prefix + chr(label + 1)
+            child_end = bisect_left(keys, following, i, end)
+            first, last = keys[i], keys[child_end - 1]
+            child_depth = depth + 1
+            while child_depth < min(len(first), len(last)) and first[child_depth] == last[child_depth]:
+                child_depth += 1
+            starts.append(i)
+            ends.append(child_end)
+            depths.append(child_depth)
+            labels.append(label)
+            i = child_end
+        children.append(len(starts))
+        node += 1
+    return children, starts, ends, depths, labels
+
+
+def movie_leaders(name_order, person_offsets):
+    """
+    Returns a segment tree over the positions in `name_order`, as an
+    array in which entry n + i is position i and entry j below n holds
+    whichever of entries 2j and 2j + 1 is the person with more movies,
+    or the earlier position if they tie.
+    """
+    n = len(name_order)
+    movies = [person_offsets[person + 1] - person_offsets[person] for person in name_order]
+    leaders = array("i", bytes(4 * n)) + array("i", range(n))
+    for j in reversed(range(1, n)):
+        left, right = leaders[2 * j], leaders[2 * j + 1]
+        leaders[j] = right if (movies[right], left) > (movies[left], right) else left
+    return leaders
+
+
+def read_rows(filename, fields):
+    """
+    Returns a list of tuples holding `fields` from each row of a CSV file.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index(field) for field in fields]
+        return [tuple(row[c] for c in columns) for row in reader]
+
+
+def offsets_for(keys, n):
+    """
+    Returns CSR row offsets for `n` rows given the row of every entry.
+    """
+    offsets = array("q", bytes(8 * (n + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    return offsets
+
+
+def find(table, key):
+    """
+    Returns the position of `key` in the sorted `table`, or None.
+    """
+    i = bisect_left(table, key)
+    if i < len(table) and table[i] == key:
+        return i
+    return None
+
+
+class PeopleView(Mapping):
+    """
+    Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids),
+    built on demand from a graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        person = self.graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": self.graph.person_names[person],
+            "birth": self.graph.person_births[person],
+            "movies": {self.graph.movie_ids[movie] for movie in self.graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return (self.graph.person_ids[i] for i in range(self.graph.person_count()))
+
+    def __len__(self):
+        return self.graph.person_count()
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+
+class MovieView(Mapping):
+    """
+    Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids),
+    built on demand from a graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        movie = self.graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": self.graph.movie_titles[movie],
+            "year": self.graph.movie_years[movie],
+            "stars": {self.graph.person_ids[person] for person in self.graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return (self.graph.movie_ids[i] for i in range(self.graph.movie_count()))
+
+    def __len__(self):
+        return self.graph.movie_count()
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+
+class NameView(Mapping):
+    """
+    Maps lowercase names to a set of corresponding person_ids,
+    built on demand from a graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people or name != name.lower():
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        keys = self.graph.name_keys
+        for i in range(len(keys)):
+            if i == 0 or keys[i] != keys[i - 1]:
+                yield keys[i]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+if __name__ == "__main__":
+    main()
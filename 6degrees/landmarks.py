@@ -0,0 +1,215 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import csv_stamp, load_graph
+
+# Index layout: a header holding the magic, version, landmark count,
+# person count and CSV stamp, then the landmark person indices, then
+# one row of int16 distances per landmark (-1 where unreachable)
+INDEX_NAME = "landmarks.index"
+INDEX_MAGIC = b"LANDMARK"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<8sII1s7xq6q")
+
+# Number of landmarks chosen when none is given
+LANDMARKS = 16
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python landmarks.py directory [count]")
+    directory = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) == 3 else LANDMARKS
+
+    print("Loading data...")
+    graph = load_graph(directory)
+    print(f"Measuring distances from {count} landmarks...")
+    index = LandmarkIndex.build(graph, count)
+    index.save(os.path.join(directory, INDEX_NAME), csv_stamp(directory))
+    for landmark in index.landmarks:
+        print(f"  {graph.person_names[landmark]} ({graph.person_ids[landmark]})")
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few well-connected people.
+
+    By the triangle inequality, for any landmark L the degrees of
+    separation between s and t lie between |d(L, s) - d(L, t)| and
+    d(L, s) + d(L, t).
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+
+        # distances[k] holds every person's distance from landmark k
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=LANDMARKS):
+        """
+        Returns an index over the `count` people with the most co-stars.
+        """
+        def costar_count(person):
+            return sum(
+                graph.movie_offsets[movie + 1] - graph.movie_offsets[movie] - 1
+                for movie in graph.movies_of(person)
+            )
+
+        people = range(graph.person_count())
+        landmarks = array("i", heapq.nlargest(count, people, key=costar_count))
+        return cls(graph, landmarks, [distances_from(graph, landmark) for landmark in landmarks])
+
+    @classmethod
+    def load(cls, graph, directory):
+        """
+        Returns the index saved in `directory`,
+        or None if it is missing, stale or damaged.
+        """
+        try:
+            with open(os.path.join(directory, INDEX_NAME), "rb") as f:
+                view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            magic, version, count, byteorder, people, *stamp = INDEX_HEADER.unpack_from(view)
+        except (OSError, ValueError, struct.error):
+            return None
+        if (magic != INDEX_MAGIC or version != INDEX_VERSION or
+                byteorder != sys.byteorder[0].encode() or
+                people != graph.person_count() or tuple(stamp) != csv_stamp(directory)):
+            return None
+
+        # A file cut short by whole items would still slice cleanly
+        position = INDEX_HEADER.size
+        if position + 4 * count + (-4 * count) % 8 + 2 * people * count != len(view):
+            return None
+        landmarks = view[position:position + 4 * count].cast("i")
+        position += 4 * count + (-4 * count) % 8
+        distances = []
+        for _ in range(count):
+            distances.append(view[position:position + 2 * people].cast("h"))
+            position += 2 * people
+        return cls(graph, landmarks, distances)
+
+    def save(self, filename, stamp):
+        """
+        Writes the index to a file, replacing any previous one atomically.
+        """
+        count = len(self.landmarks)
+        temporary = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(INDEX_HEADER.pack(
+                    INDEX_MAGIC, INDEX_VERSION, count, sys.byteorder[0].encode(),
+                    self.graph.person_count(), *stamp
+                ))
+                f.write(memoryview(array("i", self.landmarks)))
+                f.write(bytes((-4 * count) % 8))
+                for row in self.distances:
+                    f.write(memoryview(row))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        os.replace(temporary, filename)
+
+    def profile(self, person):
+        """
+        Returns the distance from every landmark to a person index.
+        """
+        return [row[person] for row in self.distances]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person indices. upper is None if no landmark reaches both.
+
+        Returns None if the landmarks prove the two are not connected.
+        """
+        if source == target:
+            return 0, 0
+        lower = 0
+        upper = None
+        for s, t in zip(self.profile(source), self.profile(target)):
+            if s < 0 and t < 0:
+                continue
+            if s < 0 or t < 0:
+                return None
+            lower = max(lower, abs(s - t))
+            if upper is None or s + t < upper:
+                upper = s + t
+        return max(lower, 1), upper
+
+    def estimate(self, source_id, target_id):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person IDs, as for `bounds`.
+        """
+        return self.bounds(self.graph.person_index(source_id), self.graph.person_index(target_id))
+
+    def heuristic(self, target):
+        """
+        Returns a function giving a lower bound on the distance from any
+        person index to `target`, or None where it cannot reach `target`.
+        """
+        rows = []
+        unreachable = []
+        for row, t in zip(self.distances, self.profile(target)):
+            if t >= 0:
+                rows.append((row, t))
+            else:
+                unreachable.append(row)
+
+        def lower_bound(person):
+            bound = 0
+            for row, t in rows:
+                d = row[person]
+                if d < 0:
+                    return None
+                if abs(d - t) > bound:
+                    bound = abs(d - t)
+            for row in unreachable:
+                if row[person] >= 0:
+                    return None
+            return bound
+
+        return lower_bound
+
+
+def distances_from(graph, person):
+    """
+    Returns an int16 array of every person's distance from `person`,
+    with -1 for people it cannot reach.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    distances = array("h", [-1]) * graph.person_count()
+    seen_movies = bytearray(graph.movie_count())
+    distances[person] = 0
+    layer = [person]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    neighbor = movie_people[j]
+                    if distances[neighbor] < 0:
+                        distances[neighbor] = depth
+                        next_layer.append(neighbor)
+        layer = next_layer
+    return distances
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import heapq
+import sys
+from bisect import bisect_left
+
+from graph import load_graph
+
+# Candidates returned by default when searching for a name
+LIMIT = 10
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python lookup.py directory [distance]")
+    directory = sys.argv[1]
+    distance = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    index = NameIndex(load_graph(directory))
+    while True:
+        try:
+            query = input("Name: ")
+        except EOFError:
+            break
+        for candidate in index.candidates(query, max_distance=distance):
+            print(f"  ID: {candidate['id']}, Name: {candidate['name']}, "
+                  f"Birth: {candidate['birth']}, Movies: {candidate['movies']}")
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup of people by name.
+
+    Searches run over the graph's sorted table of lowercase names, the
+    radix trie built over it and the tree of who has the most movies in
+    each part of it, all saved with the graph snapshot. Every range of
+    names sharing a prefix is contiguous, so each trie node is a range
+    of the table.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.keys = graph.name_keys
+        self.order = graph.name_order
+
+    def exact(self, name):
+        """
+        Returns the indices of every person named `name`, ignoring case.
+        """
+        return self.graph.people_named(name)
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns the indices of people whose lowercase name starts with
+        `prefix`, in name order, stopping after `limit` if given.
+        """
+        start, end = self.prefix_range(prefix.lower(), 0, len(self.keys))
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self.order[i] for i in range(start, end)]
+
+    def fuzzy(self, name, max_distance=None):
+        """
+        Returns (distance, person) pairs for every person whose lowercase
+        name is within `max_distance` edits of `name`, nearest first.
+
+        By default one edit is allowed, or two for names of ten or more
+        characters.
+        """
+        target = name.lower()
+        if max_distance is None:
+            max_distance = 1 if len(target) < 10 else 2
+        graph = self.graph
+        keys = self.keys
+        children = graph.trie_children
+        starts = graph.trie_starts
+        depths = graph.trie_depths
+        labels = graph.trie_labels
+        columns = len(target)
+        too_far = max_distance + 1
+
+        # Rows are tuples so that steps repeated from the same row, as when
+        # sibling names continue with the same letters, are worked out once
+        steps = {}
+
+        def step(row, position, character):
+            # Returns the row after `character` is added at `position`, and
+            # whether any of it is still in range. Only the band of columns
+            # within `max_distance` of `position` can be, so the rest of the
+            # row is left at `too_far`.
+            key = (row, position, character)
+            if key not in steps:
+                low = max(position - max_distance, 1)
+                high = min(position + max_distance, columns)
+                following = [position if position <= max_distance else too_far] + [too_far] * columns
+                for column in range(low, high + 1):
+                    following[column] = min(
+                        following[column - 1] + 1,
+                        row[column] + 1,
+                        row[column - 1] + (target[column - 1] != character)
+                    )
+                in_range = min(following[low - 1:high + 1], default=too_far) <= max_distance
+                steps[key] = (tuple(following), in_range)
+            return steps[key]
+
+        # Walk the trie depth first, carrying the Levenshtein row for each
+        # prefix and dropping prefixes that are already too far
+        found = []
+        stack = [(0, tuple(range(min(columns, max_distance) + 1)) + (too_far,) * max(columns - max_distance, 0))]
+        while stack:
+            node, row = stack.pop()
+            depth = depths[node]
+            first_child, last_child = children[node], children[node + 1]
+
+            # Names exactly as long as the prefix come first in its range
+            if row[-1] <= max_distance:
+                end = starts[first_child] if first_child < last_child else graph.trie_ends[node]
+                found.extend((row[-1], self.order[i]) for i in range(starts[node], end))
+            if first_child == last_child:
+                continue
+
+            # The row after any character not in the target near this
+            # position is the same, so when it is out of range only the
+            # children whose edge starts with one of those characters
+            # need to be followed
+            position = depth + 1
+            nearby = target[max(position - max_distance, 1) - 1:position + max_distance]
+            missed = step(row, position, "")
+            if missed[1]:
+                following = range(first_child, last_child)
+            else:
+                following = []
+                for code in set(map(ord, nearby)):
+                    child = bisect_left(labels, code, first_child, last_child)
+                    if child < last_child and labels[child] == code:
+                        following.append(child)
+
+            for child in following:
+                character = chr(labels[child])
+                child_row, in_range = step(row, position, character) if character in nearby else missed
+                if not in_range:
+                    continue
+                child_depth = depths[child]
+                if child_depth > position:
+                    edge = keys[starts[child]][position:child_depth]
+                    for position_on_edge, character in enumerate(edge, position + 1):
+                        child_row, in_range = step(child_row, position_on_edge, character)
+                        if not in_range:
+                            break
+                if in_range:
+                    stack.append((child, child_row))
+
+        found.sort()
+        return found
+
+    def candidates(self, query, limit=LIMIT, max_distance=None):
+        """
+        Returns up to `limit` people matching `query`, without prompting.
+
+        Exact matches come first, then names starting with `query`, then
+        names within a few typos of it. Within each group, people with
+        more movies are ranked first. Each candidate is a dictionary of:
+        id, name, birth, movies (the number of movies), distance (the
+        number of edits from `query`, with 0 for exact and prefix matches).
+        """
+        ranked = {}
+        for person in self.exact(query):
+            ranked[person] = (0, 0)
+        for person in self.top_prefix(query, limit + len(ranked)):
+            ranked.setdefault(person, (1, 0))
+
+        # Typos rank after every exact and prefix match, so they are only
+        # looked for while there is room left
+        if len(ranked) < limit:
+            for distance, person in self.fuzzy(query, max_distance):
+                ranked.setdefault(person, (2, distance))
+
+        return self.rank(ranked, limit)
+
+    def top_prefix(self, prefix, limit):
+        """
+        Returns up to `limit` people whose lowercase name starts with
+        `prefix`, those with the most movies first, then in name order.
+        """
+        start, end = self.prefix_range(prefix.lower(), 0, len(self.keys))
+        heap = [(self.leader(start, end), start, end)] if start < end else []
+        found = []
+        while heap and len(found) < limit:
+            # Taking the leader of a range splits the rest in two around it
+            (_, position), start, end = heapq.heappop(heap)
+            found.append(self.order[position])
+            for start, end in ((start, position), (position + 1, end)):
+                if start < end:
+                    heapq.heappush(heap, (self.leader(start, end), start, end))
+        return found
+
+    def leader(self, start, end):
+        """
+        Returns (-movies, position) for the person with the most movies
+        among positions [start, end) of the name table, the earliest
+        position on ties, from the segments of `name_leaders` covering
+        the range.
+        """
+        offsets = self.graph.person_offsets
+        leaders = self.graph.name_leaders
+        best = None
+        start += len(self.order)
+        end += len(self.order)
+        while start < end:
+            segments = []
+            if start & 1:
+                segments.append(start)
+                start += 1
+            if end & 1:
+                end -= 1
+                segments.append(end)
+            for segment in segments:
+                position = leaders[segment]
+                person = self.order[position]
+                key = (offsets[person] - offsets[person + 1], position)
+                if best is None or key < best:
+                    best = key
+            start //= 2
+            end //= 2
+        return best
+
+    def matches(self, name):
+        """
+        Returns candidates for everyone named exactly `name`, ignoring
+        case, with the people with the most movies first.
+        """
+        return self.rank({person: (0, 0) for person in self.exact(name)})
+
+    def rank(self, ranked, limit=None):
+        """
+        Returns candidate dictionaries for a mapping of person indices to
+        (group, distance), ordered by group, distance, movie count, then
+        as in the name table, stopping after `limit` if given.
+        """
+        graph = self.graph
+        offsets = graph.person_offsets
+        keys = []
+        for person, (group, distance) in ranked.items():
+            movies = offsets[person + 1] - offsets[person]
+            keys.append((group, distance, -movies, graph.person_names[person].lower(), person))
+        keys = sorted(keys) if limit is None else heapq.nsmallest(limit, keys)
+
+        # Only the people returned are looked up in full
+        return [{
+            "id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": -negated_movies,
+            "distance": distance
+        } for _, distance, negated_movies, _, person in keys]
+
+    def prefix_range(self, prefix, start, end):
+        """
+        Returns the range of positions in [start, end) whose name
+        starts with `prefix`.
+        """
+        start = bisect_left(self.keys, prefix, start, end)
+        if not prefix:
+            return start, end
+        following = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return start, bisect_left(self.keys, following, start, end)
+
+
+if __name__ == "__main__":
+    main()
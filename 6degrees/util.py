@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,13 +10,17 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+
+        # Maps each state in the frontier to the number of nodes holding it
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,10 +29,17 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self.forget(node)
             return node
 
+    def forget(self, node):
+        count = self.states[node.state] - 1
+        if count == 0:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count
+
 
 class QueueFrontier(StackFrontier):
 
@@ -33,6 +47,6 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self.forget(node)
             return node
@@ -0,0 +1,134 @@
+import csv
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import sys
+
+from elimination import Plan, pedigree
+from heredity import load_data
+
+# Compiled plans each process keeps, keyed by pedigree shape
+PLANS = 1024
+
+# Family files handed to a worker process at a time
+TASK_SIZE = 16
+
+# Columns written to CSV output, one row per person
+FIELDS = ["file", "name", "gene_2", "gene_1", "gene_0", "trait_true", "trait_false", "error"]
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python batch.py directory|pattern [output.csv|output.jsonl|-] [workers]")
+    filenames = family_files(sys.argv[1])
+    output = sys.argv[2] if len(sys.argv) >= 3 else "-"
+    workers = int(sys.argv[3]) if len(sys.argv) == 4 else 1
+
+    pool = None
+    if workers > 1:
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        pool = context.Pool(workers)
+
+    try:
+        if output == "-":
+            write_jsonl(score_families(filenames, pool), sys.stdout)
+        else:
+            with open(output, "w", newline="") as f:
+                if output.endswith(".csv"):
+                    write_csv(score_families(filenames, pool), f)
+                else:
+                    write_jsonl(score_families(filenames, pool), f)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def family_files(pattern):
+    """
+    Returns the sorted family CSV files in a directory, or matching a glob.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(glob.glob(pattern))
+
+
+def score_families(filenames, pool=None):
+    """
+    Yield (filename, probabilities, error) for every family file in
+    input order, where `probabilities` is keyed as in `heredity.main`,
+    or None with a message in `error` if the file could not be scored.
+
+    If `pool` is given, files are scored in its worker processes.
+    """
+    if pool is None:
+        yield from map(score_file, filenames)
+    else:
+        yield from pool.imap(score_file, filenames, chunksize=TASK_SIZE)
+
+
+def score_file(filename):
+    """
+    Returns (filename, probabilities, error) for one family file.
+    """
+    try:
+        people = load_data(filename)
+        return filename, plan_for(pedigree(people)).marginals(people), None
+    except (OSError, KeyError, ValueError) as e:
+        return filename, None, f"{type(e).__name__}: {e}"
+
+
+@functools.lru_cache(maxsize=PLANS)
+def plan_for(parents):
+    """
+    Returns the compiled plan for a pedigree shape, as from `pedigree`,
+    so families with the same shape compile it only once per process.
+    """
+    return Plan(parents)
+
+
+def records(results):
+    """
+    Yield one flat dictionary per person scored, or one per file that
+    failed, holding the columns in `FIELDS`.
+    """
+    for filename, probabilities, error in results:
+        if probabilities is None:
+            yield {"file": filename, "error": error}
+            continue
+        for name, distributions in probabilities.items():
+            yield {
+                "file": filename,
+                "name": name,
+                "gene_2": distributions["gene"][2],
+                "gene_1": distributions["gene"][1],
+                "gene_0": distributions["gene"][0],
+                "trait_true": distributions["trait"][True],
+                "trait_false": distributions["trait"][False],
+            }
+
+
+def write_csv(results, out):
+    """
+    Writes scored families to `out` as CSV, one row per person.
+    """
+    writer = csv.DictWriter(out, FIELDS)
+    writer.writeheader()
+    writer.writerows(records(results))
+
+
+def write_jsonl(results, out):
+    """
+    Writes scored families to `out` as JSON lines, one per person.
+    """
+    for record in records(results):
+        out.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
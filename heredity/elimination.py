@@ -0,0 +1,238 @@
+import heapq
+import sys
+
+import numpy as np
+
+from heredity import PROBS, gene_table, inheritance_table, load_data, trait_table
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python elimination.py data.csv")
+    people = load_data(sys.argv[1])
+    probabilities = marginals(people)
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+class Plan():
+    """
+    Junction tree compiled from the shape of a pedigree, ready to compute
+    the marginals of any family with that shape.
+
+    Each person's gene count is a variable, numbered by the person's
+    position in the family. Variables are eliminated one at a time in
+    greedy min-fill order over the moral graph; eliminating a variable
+    forms a clique of it and its remaining neighbours, whose separator
+    (the clique less that variable) is passed to the clique of the first
+    separator variable eliminated after it. Traits are leaves, so they
+    only enter as evidence on their person's gene.
+    """
+
+    def __init__(self, parents, probs=PROBS):
+        # parents[i] is (mother, father) variable numbers, or None
+        self.parents = parents
+        n = len(parents)
+        self.order = elimination_order(moral_graph(parents))
+        position = {variable: i for i, variable in enumerate(self.order)}
+
+        # cliques[i] is formed by eliminating order[i], listed first
+        self.cliques = []
+        remaining = moral_graph(parents)
+        for variable in self.order:
+            neighbours = sorted(remaining.pop(variable), key=position.get)
+            self.cliques.append((variable, *neighbours))
+            for neighbour in neighbours:
+                remaining[neighbour].discard(variable)
+                remaining[neighbour].update(other for other in neighbours if other != neighbour)
+
+        self.separators = [clique[1:] for clique in self.cliques]
+        self.parent = [position[separator[0]] if separator else None for separator in self.separators]
+        self.children = [[] for _ in self.cliques]
+        for i, parent in enumerate(self.parent):
+            if parent is not None:
+                self.children[parent].append(i)
+
+        # Each person's gene distribution goes to the clique of whichever
+        # of the person and their parents is eliminated first
+        inheritance = inheritance_table(probs)
+        genes = gene_table(probs)
+        self.potentials = [[] for _ in self.cliques]
+        for child, pair in enumerate(parents):
+            if pair is None:
+                factor = ((child,), genes)
+            else:
+                factor = ((*pair, child), inheritance)
+            self.potentials[min(position[variable] for variable in factor[0])].append(factor)
+
+        self.clique_of = [position[variable] for variable in range(n)]
+        self.traits = trait_table(probs)
+
+    @classmethod
+    def from_people(cls, people, probs=PROBS):
+        """
+        Compile the plan for a family as returned by `load_data`.
+        """
+        return cls(pedigree(people), probs)
+
+    def gene_marginals(self, evidence):
+        """
+        Returns an array with one row per person holding the probability
+        of 0, 1 and 2 copies of the gene given the observed traits.
+
+        `evidence[i]` is person i's trait as True or False, or None if
+        unknown.
+        """
+        potentials = [list(factors) for factors in self.potentials]
+        for variable, trait in enumerate(evidence):
+            if trait is not None:
+                potentials[self.clique_of[variable]].append(((variable,), self.traits[:, int(trait)]))
+
+        # Collect towards the roots in elimination order, then distribute
+        upward = [None] * len(self.cliques)
+        for i, parent in enumerate(self.parent):
+            if parent is not None:
+                upward[i] = message(
+                    potentials[i] + [upward[child] for child in self.children[i]], self.separators[i]
+                )
+        downward = [None] * len(self.cliques)
+        for i in reversed(range(len(self.cliques))):
+            parent = self.parent[i]
+            if parent is not None:
+                incoming = [upward[child] for child in self.children[parent] if child != i]
+                if downward[parent] is not None:
+                    incoming.append(downward[parent])
+                downward[i] = message(potentials[parent] + incoming, self.separators[i])
+
+        genes = np.empty((len(self.parents), 3))
+        for variable, i in enumerate(self.clique_of):
+            incoming = [upward[child] for child in self.children[i]]
+            if downward[i] is not None:
+                incoming.append(downward[i])
+            genes[variable] = message(potentials[i] + incoming, (variable,))[1]
+        return genes
+
+    def marginals(self, people):
+        """
+        Returns the gene and trait distribution of every person in a
+        family with this plan's shape, keyed like the probabilities
+        computed by `heredity.main`.
+        """
+        names = list(people)
+        evidence = [people[name]["trait"] for name in names]
+        genes = self.gene_marginals(evidence)
+        traits = genes @ self.traits
+        probabilities = {}
+        for i, name in enumerate(names):
+            if evidence[i] is not None:
+                traits[i] = (0, 1) if evidence[i] else (1, 0)
+            probabilities[name] = {
+                "gene": {count: float(genes[i, count]) for count in (2, 1, 0)},
+                "trait": {True: float(traits[i, 1]), False: float(traits[i, 0])},
+            }
+        return probabilities
+
+
+def marginals(people, probs=PROBS):
+    """
+    Return the gene and trait distribution of every person in `people`,
+    as computed by `heredity.main`, by message passing over a junction
+    tree of the pedigree instead of enumerating every assignment.
+    """
+    return Plan.from_people(people, probs).marginals(people)
+
+
+def pedigree(people):
+    """
+    Returns the (mother, father) position of each person in `people`,
+    or None for people without parents in the data.
+    """
+    position = {name: i for i, name in enumerate(people)}
+    return tuple(
+        None if person["mother"] is None else (position[person["mother"]], position[person["father"]])
+        for person in people.values()
+    )
+
+
+def moral_graph(parents):
+    """
+    Returns the neighbours of each variable once parents are joined to
+    their children and to each other.
+    """
+    graph = {variable: set() for variable in range(len(parents))}
+    for child, pair in enumerate(parents):
+        if pair is None:
+            continue
+        family = (*pair, child)
+        for variable in family:
+            graph[variable].update(other for other in family if other != variable)
+    return graph
+
+
+def elimination_order(graph):
+    """
+    Returns an order to eliminate the variables of `graph` in, each time
+    choosing the variable whose elimination adds the fewest edges between
+    its neighbours, breaking ties by fewest neighbours and then number.
+    """
+    graph = {variable: set(neighbours) for variable, neighbours in graph.items()}
+
+    def cost(variable):
+        neighbours = graph[variable]
+        fill = sum(len(neighbours - graph[other]) - 1 for other in neighbours) // 2
+        return (fill, len(neighbours), variable)
+
+    # Heap entries go stale when a variable's cost changes, and are
+    # skipped unless they match `costs`
+    costs = {variable: cost(variable) for variable in graph}
+    heap = list(costs.values())
+    heapq.heapify(heap)
+    order = []
+    while costs:
+        entry = heapq.heappop(heap)
+        variable = entry[2]
+        if costs.get(variable) != entry:
+            continue
+        order.append(variable)
+        neighbours = graph.pop(variable)
+        del costs[variable]
+        for other in neighbours:
+            graph[other].discard(variable)
+            graph[other].update(neighbours - {other})
+
+        # Only the costs of variables next to the change can have moved
+        touched = set(neighbours)
+        for other in neighbours:
+            touched.update(graph[other])
+        for other in touched:
+            costs[other] = cost(other)
+            heapq.heappush(heap, costs[other])
+    return order
+
+
+def message(factors, variables):
+    """
+    Returns the product of `factors`, each a (variables, array) pair,
+    summed down to `variables` and scaled to sum to 1. Variables that
+    no factor mentions are uniform.
+    """
+    letters = {}
+    operands = []
+    for names, values in factors:
+        operands.append(values)
+        operands.append([letters.setdefault(name, len(letters)) for name in names])
+    for name in variables:
+        if name not in letters:
+            operands.append(np.ones(3))
+            operands.append([letters.setdefault(name, len(letters))])
+    values = np.einsum(*operands, [letters[name] for name in variables])
+    return tuple(variables), values / values.sum()
+
+
+if __name__ == "__main__":
+    main()
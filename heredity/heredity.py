@@ -1,7 +1,11 @@
 import csv
 import itertools
+import math
+import multiprocessing
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,14 +40,91 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Assignments evaluated together by `batch_probabilities`
+BLOCK = 1 << 16
+
+# Samples each chain draws between precision checks, when sampling
+SAMPLE_BLOCK = 1 << 13
+
+# Largest number of samples each chain may draw
+MAX_SAMPLES = 1000000
+
+# Gibbs sweeps each chain discards before it starts counting
+BURN_IN = 100
+
+# Independent Gibbs walkers moved together within each chain
+WALKERS = 256
+
+# Default half-width of the confidence intervals sampling stops at
+PRECISION = 0.005
+
+# Normal quantile for 95% confidence intervals
+Z = 1.96
+
+# Family shared with sampling worker processes
+worker_family = None
+
+
+def inheritance_table(probs=PROBS):
+    """
+    Returns an array `table` where `table[mother, father, child]` is the
+    probability of a child having `child` copies of the gene given how
+    many copies its mother and father have.
+    """
+    mutation = probs["mutation"]
+
+    # Chance of a parent with 0, 1 or 2 copies passing the gene on
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    table = np.empty((3, 3, 3))
+    table[:, :, 0] = np.outer(1 - passes, 1 - passes)
+    table[:, :, 1] = np.outer(passes, 1 - passes) + np.outer(1 - passes, passes)
+    table[:, :, 2] = np.outer(passes, passes)
+    return table
+
+
+def gene_table(probs=PROBS):
+    """
+    Returns the unconditional probability of 0, 1 and 2 copies of the gene.
+    """
+    return np.array([probs["gene"][genes] for genes in range(3)])
+
+
+def trait_table(probs=PROBS):
+    """
+    Returns an array `table` where `table[genes, trait]` is the chance of
+    `trait` (0 for False, 1 for True) given `genes` copies of the gene.
+    """
+    return np.array([[probs["trait"][genes][False], probs["trait"][genes][True]] for genes in range(3)])
+
+
+# PROBS as arrays, indexed by gene count and trait
+INHERITANCE = inheritance_table()
+GENES = gene_table()
+TRAITS = trait_table()
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python heredity.py data.csv [likelihood|gibbs] [precision]")
     people = load_data(sys.argv[1])
 
+    # Estimate probabilities by sampling if a method is given
+    if len(sys.argv) > 2:
+        precision = float(sys.argv[3]) if len(sys.argv) == 4 else PRECISION
+        probabilities, intervals, samples = sample_probabilities(people, sys.argv[2], precision=precision)
+        print(f"Estimates from {samples} samples, with 95% confidence intervals")
+        for person in people:
+            print(f"{person}:")
+            for field in probabilities[person]:
+                print(f"  {field.capitalize()}:")
+                for value in probabilities[person][field]:
+                    p = probabilities[person][field][value]
+                    low, high = intervals[person][field][value]
+                    print(f"    {value}: {p:.4f} ({low:.4f} to {high:.4f})")
+        return
+
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -60,26 +141,9 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Loop over every assignment consistent with known traits
+    for one_gene, two_genes, have_trait, p in assignments(people):
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
@@ -128,6 +192,99 @@ def powerset(s):
     ]
 
 
+def assignments(people):
+    """
+    Yield (one_gene, two_genes, have_trait, p) for every assignment of
+    gene counts and traits that agrees with the traits known in `people`,
+    where `p` is its joint probability.
+
+    Assignments are built depth first, parents before children, with
+    known traits fixed, so each person only multiplies their own factor
+    into the product of the people before them. Partial assignments whose
+    product is already zero are skipped whole. The same three sets are
+    updated in place between assignments; copy them to keep one.
+    """
+    order = family_order(people)
+    inheritance = INHERITANCE.tolist()
+    choices = [
+        [(genes, trait) for genes in (0, 1, 2) for trait in
+         ((True, False) if people[person]["trait"] is None else (people[person]["trait"],))]
+        for person in order
+    ]
+
+    one_gene = set()
+    two_genes = set()
+    have_trait = set()
+    counts = {}
+
+    # products[depth] is the joint probability of order[:depth]
+    products = [1.0] * (len(order) + 1)
+    chosen = [0] * len(order)
+    depth = 0
+    while depth >= 0:
+        if depth == len(order):
+            yield one_gene, two_genes, have_trait, products[depth]
+            depth -= 1
+            continue
+
+        person = order[depth]
+        one_gene.discard(person)
+        two_genes.discard(person)
+        have_trait.discard(person)
+        if chosen[depth] == len(choices[depth]):
+            chosen[depth] = 0
+            depth -= 1
+            continue
+        genes, trait = choices[depth][chosen[depth]]
+        chosen[depth] += 1
+
+        mother = people[person]["mother"]
+        if mother is None:
+            p = PROBS["gene"][genes]
+        else:
+            p = inheritance[counts[mother]][counts[people[person]["father"]]][genes]
+        p *= products[depth] * PROBS["trait"][genes][trait]
+        if p == 0:
+            continue
+
+        counts[person] = genes
+        if genes == 1:
+            one_gene.add(person)
+        elif genes == 2:
+            two_genes.add(person)
+        if trait:
+            have_trait.add(person)
+        products[depth + 1] = p
+        depth += 1
+
+
+def family_order(people):
+    """
+    Returns the names in `people` ordered so that everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+    for name in people:
+        stack = [name]
+        while stack:
+            person = stack[-1]
+            if person in placed:
+                stack.pop()
+                continue
+            parents = [
+                parent for parent in (people[person]["mother"], people[person]["father"])
+                if parent is not None and parent not in placed
+            ]
+            if parents:
+                stack.extend(parents)
+            else:
+                stack.pop()
+                placed.add(person)
+                order.append(person)
+    return order
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Calculate and return the joint probability.
@@ -139,69 +296,20 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in the set `have_trait` has the trait, and
         * everyone not in set `have_trait` does not have the trait.
     """
-    parents = set()
-    children = set()
-
+    probability = 1
     for person in people:
-        if people[person]['mother'] is None:
-            parents.add(person)
+        genes = 1 * (person in one_gene) + 2 * (person in two_genes)
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None:
+            probability *= PROBS["gene"][genes]
         else:
-            children.add(person)
-
-    antes = 1
-    for person in parents:
-        num = 1 * (person in one_gene) + 2 * (person in two_genes)
-        have = (person in have_trait)
-        antes *= PROBS["gene"][num] * PROBS["trait"][num][have]
+            mother_genes = 1 * (mother in one_gene) + 2 * (mother in two_genes)
+            father_genes = 1 * (father in one_gene) + 2 * (father in two_genes)
+            probability *= INHERITANCE[mother_genes, father_genes, genes]
+        probability *= PROBS["trait"][genes][person in have_trait]
 
-    conses = 1
-    for person in children:
-        mom = people[person]["mother"]
-        dad = people[person]["father"]
-        num = 1 * (person in one_gene) + 2 * (person in two_genes)
-        num_mom = 1 * (mom in one_gene) + 2 * (mom in two_genes)
-        num_dad = 1 * (dad in one_gene) + 2 * (dad in two_genes)
-        have = (person in have_trait)
-        mutation = PROBS["mutation"]
-
-        if num == 0:
-            if num_dad == 0 and num_mom == 0:
-                effect = (1 - mutation) * (1 - mutation)
-            elif (num_dad == 2 and num_mom == 2):
-                effect = mutation * mutation
-            elif (num_dad == 2 and num_mom == 0) or (num_dad == 0 and num_mom == 2):
-                effect = mutation * (1 - mutation)
-            elif (num_dad == 0 and num_mom == 1) or (num_dad == 1 and num_mom == 0):
-                effect = (1 - mutation) * 0.5
-            elif (num_dad == 2 and num_mom == 1) or (num_dad == 1 and num_mom == 2):
-                effect = mutation * 0.5
-            else:
-                effect = 0.5 * 0.5
-        elif num == 1:
-            if (num_dad == 0 and num_mom == 0) or (num_dad == 2 and num_mom == 2):
-                effect = mutation * (1 - mutation)
-            elif (num_dad == 2 and num_mom == 0) or (num_dad == 0 and num_mom == 2):
-                effect = (1 - mutation) * (1 - mutation) + mutation * mutation
-            elif (num_dad == 1 and num_mom == 1):
-                effect = 2 * 0.5 * 0.5
-            else:
-                effect = mutation * 0.5 + (1 - mutation) * 0.5
-        else:
-            if num_dad == 0 and num_mom == 0:
-                effect = mutation * mutation
-            elif (num_dad == 2 and num_mom == 2):
-                effect = (1 - mutation) * (1 - mutation)
-            elif (num_dad == 2 and num_mom == 0) or (num_dad == 0 and num_mom == 2):
-                effect = mutation * (1 - mutation)
-            elif (num_dad == 0 and num_mom == 1) or (num_dad == 1 and num_mom == 0):
-                effect = mutation * 0.5
-            elif (num_dad == 2 and num_mom == 1) or (num_dad == 1 and num_mom == 2):
-                effect = (1 - mutation) * 0.5
-            else:
-                effect = 0.5 * 0.5
-        conses *= effect * PROBS["trait"][num][have]
-
-    return antes * conses
+    return float(probability)
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
@@ -235,5 +343,363 @@ def normalize(probabilities):
     return
 
 
+class Family():
+    """
+    Pedigree of a family as index arrays, for evaluating the joint
+    probability of whole blocks of assignments at once.
+
+    An assignment block is a pair of arrays with one row per assignment
+    and one column per person: `genes` holding gene counts and `traits`
+    holding whether each person has the trait.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        position = {name: i for i, name in enumerate(self.names)}
+        has_parents = np.array([people[name]["mother"] is not None for name in self.names], dtype=bool)
+        self.founders = np.flatnonzero(~has_parents)
+        self.children = np.flatnonzero(has_parents)
+        self.mothers = np.array([position[people[self.names[i]]["mother"]] for i in self.children], dtype=int)
+        self.fathers = np.array([position[people[self.names[i]]["father"]] for i in self.children], dtype=int)
+
+        # Columns of people whose trait is known, and that trait
+        self.evidence = [people[name]["trait"] for name in self.names]
+        self.observed = np.array([trait is not None for trait in self.evidence])
+        self.unobserved = np.flatnonzero(~self.observed)
+        self.known = np.array([bool(trait) for trait in self.evidence], dtype=int)
+
+        # Everyone after their parents, each person's (mother, father) or
+        # None, and the (child, other parent) pairs each person is a
+        # mother or father in
+        self.order = [position[name] for name in family_order(people)]
+        self.parents = [None] * len(self.names)
+        self.as_mother = [[] for _ in self.names]
+        self.as_father = [[] for _ in self.names]
+        for child, mother, father in zip(self.children, self.mothers, self.fathers):
+            self.parents[child] = (mother, father)
+            self.as_mother[mother].append((child, father))
+            self.as_father[father].append((child, mother))
+
+    def joint_probabilities(self, genes, traits):
+        """
+        Returns the joint probability of every assignment in a block, as
+        `joint_probability` would for each row.
+        """
+        probabilities = GENES[genes[:, self.founders]].prod(axis=1)
+        inheritance = (genes[:, self.mothers] * 3 + genes[:, self.fathers]) * 3 + genes[:, self.children]
+        probabilities *= INHERITANCE.ravel()[inheritance].prod(axis=1)
+        probabilities *= TRAITS.ravel()[genes * 2 + traits].prod(axis=1)
+        return probabilities
+
+    def assignments(self, block=BLOCK):
+        """
+        Yield blocks of at most `block` assignments, covering every gene
+        count for everyone and every trait for people whose trait is not
+        known. Known traits are fixed to the evidence.
+        """
+        n = len(self.names)
+        gene_count = 3 ** n
+        total = gene_count * 2 ** len(self.unobserved)
+        powers = 3 ** np.arange(n)
+        bits = 1 << np.arange(len(self.unobserved))
+        fixed = np.array([bool(trait) for trait in self.evidence])
+        for start in range(0, total, block):
+            index = np.arange(start, min(start + block, total), dtype=np.int64)
+            genes = (index[:, None] % gene_count) // powers % 3
+            traits = np.broadcast_to(fixed, genes.shape).copy()
+            traits[:, self.unobserved] = (index[:, None] // gene_count) & bits != 0
+            yield genes, traits
+
+    def forward_sample(self, samples, rng):
+        """
+        Returns `samples` rows of gene counts drawn from parents to
+        children, ignoring traits.
+        """
+        genes = np.empty((samples, len(self.names)), dtype=int)
+        for i in self.order:
+            if self.parents[i] is None:
+                genes[:, i] = choose(np.broadcast_to(GENES, (samples, 3)), rng)
+            else:
+                mother, father = self.parents[i]
+                genes[:, i] = choose(INHERITANCE[genes[:, mother], genes[:, father]], rng)
+        return genes
+
+    def likelihood_weighting(self, samples, rng):
+        """
+        Returns the weighted sums from `samples` forward samples, each
+        weighted by the chance of the known traits, as a tuple (scale,
+        genes, traits, weight) for `run_chain`.
+        """
+        genes = self.forward_sample(samples, rng)
+        observed = np.flatnonzero(self.observed)
+        log_weights = np.log(TRAITS[genes[:, observed], self.known[observed]]).sum(axis=1)
+        scale = log_weights.max()
+        weights = np.exp(log_weights - scale)
+        gene_sums = np.stack([weights @ (genes == count) for count in range(3)], axis=1)
+        return float(scale), gene_sums, weights @ TRAITS[genes, 1], float(weights.sum())
+
+    def gibbs(self, sweeps, rng, state=None):
+        """
+        Returns the sums from `sweeps` Gibbs sweeps of `WALKERS` walkers
+        as a tuple (scale, genes, traits, weight, state) for `run_chain`.
+
+        Walkers continue from `state`, or start from forward samples and
+        first sweep `BURN_IN` times. Each person's full conditional is
+        added to the sums rather than the count it drew.
+        """
+        if state is None:
+            genes = self.forward_sample(WALKERS, rng)
+            burn_in = BURN_IN
+        else:
+            genes = state
+            burn_in = 0
+        gene_sums = np.zeros((len(self.names), 3))
+        for sweep in range(burn_in + sweeps):
+            for i in range(len(self.names)):
+                conditional = self.conditional(genes, i)
+                genes[:, i] = choose(conditional, rng)
+                if sweep >= burn_in:
+                    gene_sums[i] += conditional.sum(axis=0)
+        return 0.0, gene_sums, gene_sums @ TRAITS[:, 1], float(sweeps * WALKERS), genes
+
+    def conditional(self, genes, i):
+        """
+        Returns the distribution of person i's gene count in each row of
+        `genes` given everyone else's and i's known trait.
+        """
+        if self.parents[i] is None:
+            p = np.tile(GENES, (len(genes), 1))
+        else:
+            mother, father = self.parents[i]
+            p = INHERITANCE[genes[:, mother], genes[:, father]]
+        for child, father in self.as_mother[i]:
+            p *= INHERITANCE[:, genes[:, father], genes[:, child]].T
+        for child, mother in self.as_father[i]:
+            p *= INHERITANCE[genes[:, mother], :, genes[:, child]]
+        if self.observed[i]:
+            p *= TRAITS[:, self.known[i]]
+        return p / p.sum(axis=1, keepdims=True)
+
+
+def choose(weights, rng):
+    """
+    Returns a column drawn from each row of `weights` in proportion to
+    its entries.
+    """
+    cumulative = weights.cumsum(axis=1)
+    draws = rng.random(len(weights)) * cumulative[:, -1]
+    return (draws[:, None] >= cumulative[:, :-1]).sum(axis=1)
+
+
+def batch_probabilities(people, block=BLOCK):
+    """
+    Return the gene and trait distribution of every person in `people`,
+    as computed by `main`, evaluating `block` assignments at a time as
+    NumPy arrays.
+    """
+    family = Family(people)
+    gene_totals = np.zeros((len(family.names), 3))
+    trait_totals = np.zeros((len(family.names), 2))
+    for genes, traits in family.assignments(block):
+        p = family.joint_probabilities(genes, traits)
+        batch_update(gene_totals, trait_totals, genes, traits, p)
+    batch_normalize(gene_totals, trait_totals)
+    return {
+        name: {
+            "gene": {count: float(gene_totals[i, count]) for count in (2, 1, 0)},
+            "trait": {True: float(trait_totals[i, 1]), False: float(trait_totals[i, 0])}
+        }
+        for i, name in enumerate(family.names)
+    }
+
+
+def batch_update(gene_totals, trait_totals, genes, traits, p):
+    """
+    Add the joint probabilities `p` of a block of assignments to each
+    person's gene and trait totals, which have one row per person.
+    """
+    for count in range(3):
+        gene_totals[:, count] += p @ (genes == count)
+    with_trait = p @ traits
+    trait_totals[:, 1] += with_trait
+    trait_totals[:, 0] += p.sum() - with_trait
+
+
+def batch_normalize(gene_totals, trait_totals):
+    """
+    Scale each row of the gene and trait totals to sum to 1.
+    """
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals /= trait_totals.sum(axis=1, keepdims=True)
+
+
+def sample_probabilities(people, method="gibbs", chains=4, precision=None,
+                         block=SAMPLE_BLOCK, max_samples=MAX_SAMPLES, processes=None, seed=None):
+    """
+    Estimate the gene and trait distribution of every person in `people`
+    by sampling, with `chains` independent chains run across a process
+    pool, each with its own seed derived from `seed`.
+
+    `method` is "likelihood" (likelihood weighting: gene counts drawn
+    forward from parents to children, weighted by the chance of the known
+    traits) or "gibbs" (Gibbs sampling: each person's gene count redrawn
+    in turn given everyone else's, after `BURN_IN` sweeps). Likelihood
+    weights collapse onto a few samples once many traits are known, so
+    Gibbs sampling suits large pedigrees better.
+
+    Every chain draws `block` samples at a time. Sampling stops once each
+    confidence interval is narrower than `precision` either side, or once
+    each chain has drawn `max_samples`, which must be at least one block.
+    Without `precision`, each chain draws exactly one block, and with a
+    single chain every interval is (0, 1).
+
+    Return a tuple (probabilities, intervals, samples) where
+    `probabilities` is keyed as in `main`, `intervals` holds a (low, high)
+    95% confidence interval for each probability, and `samples` is the
+    total number of samples drawn.
+    """
+    if method not in ("likelihood", "gibbs"):
+        raise ValueError(f"unknown method {method!r}, expected likelihood or gibbs")
+    if chains < 2 and precision is not None:
+        raise ValueError("at least two chains are needed to estimate precision")
+    if max_samples < block:
+        raise ValueError("max_samples must be at least one block")
+    family = Family(people)
+    n = len(family.names)
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    states = [None] * chains
+
+    # Standard errors are infinite for a single chain, which has no
+    # spread between chains to measure
+    width = t_quantile(chains - 1) if chains >= 2 else 1
+
+    # Per chain: log of the scale the sums are kept at, weighted gene and
+    # trait sums and total weight
+    scales = np.full(chains, -np.inf)
+    gene_sums = np.zeros((chains, n, 3))
+    trait_sums = np.zeros((chains, n))
+    weights = np.zeros(chains)
+
+    if processes == 1:
+        pool = None
+        set_worker_family(family)
+    else:
+        pool = multiprocessing.Pool(processes, initializer=set_worker_family, initargs=(family,))
+    try:
+        drawn = 0
+        while drawn < max_samples:
+            tasks = [
+                (method, block, int(chain_seed.spawn(1)[0].generate_state(1)[0]), state)
+                for chain_seed, state in zip(seeds, states)
+            ]
+            results = map(run_chain, tasks) if pool is None else pool.map(run_chain, tasks)
+            for chain, (scale, genes, traits, weight, state) in enumerate(results):
+                top = max(scales[chain], scale)
+                old = math.exp(scales[chain] - top)
+                new = math.exp(scale - top)
+                gene_sums[chain] = gene_sums[chain] * old + genes * new
+                trait_sums[chain] = trait_sums[chain] * old + traits * new
+                weights[chain] = weights[chain] * old + weight * new
+                scales[chain] = top
+                states[chain] = state
+            drawn += block
+
+            # Known traits are replaced by the evidence, so only the
+            # unknown ones need to be precise
+            gene_errors, trait_errors = standard_errors(gene_sums, trait_sums, weights)
+            trait_error = trait_errors.max(initial=0, where=~family.observed)
+            if precision is None or width * max(gene_errors.max(), trait_error) < precision:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Chains are pooled in proportion to their weight
+    shares = np.exp(scales - scales.max())
+    genes = (gene_sums * shares[:, None, None]).sum(axis=0) / (weights * shares).sum()
+    traits = (trait_sums * shares[:, None]).sum(axis=0) / (weights * shares).sum()
+
+    probabilities = {}
+    intervals = {}
+    for i, name in enumerate(family.names):
+        if family.evidence[i] is not None:
+            traits[i] = float(family.evidence[i])
+            trait_errors[i] = 0
+        probabilities[name] = {
+            "gene": {count: float(genes[i, count]) for count in (2, 1, 0)},
+            "trait": {True: float(traits[i]), False: float(1 - traits[i])}
+        }
+        intervals[name] = {
+            "gene": {
+                count: confidence_interval(genes[i, count], width * gene_errors[i, count]) for count in (2, 1, 0)
+            },
+            "trait": {
+                True: confidence_interval(traits[i], width * trait_errors[i]),
+                False: confidence_interval(1 - traits[i], width * trait_errors[i])
+            }
+        }
+    return probabilities, intervals, drawn * chains
+
+
+def standard_errors(gene_sums, trait_sums, weights):
+    """
+    Returns the standard error of each pooled gene and trait estimate,
+    given per-chain weighted sums as rows, from the spread between chains.
+    """
+    chains = len(weights)
+    if chains < 2 or (weights == 0).any():
+        return np.full(gene_sums.shape[1:], np.inf), np.full(trait_sums.shape[1:], np.inf)
+    genes = gene_sums / weights[:, None, None]
+    traits = trait_sums / weights[:, None]
+    return genes.std(axis=0, ddof=1) / math.sqrt(chains), traits.std(axis=0, ddof=1) / math.sqrt(chains)
+
+
+def confidence_interval(estimate, margin):
+    """
+    Returns the interval `margin` either side of an estimate, within [0, 1].
+    """
+    return (float(max(estimate - margin, 0)), float(min(estimate + margin, 1)))
+
+
+def t_quantile(df):
+    """
+    Returns the 97.5th percentile of Student's t distribution with `df`
+    degrees of freedom, so a 95% confidence interval spans that many
+    standard errors either side. Uses the Cornish-Fisher expansion around
+    `Z`, which is within 1% from 3 degrees of freedom up but low below.
+    """
+    z = Z
+    return (
+        z + (z ** 3 + z) / (4 * df)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+    )
+
+
+def set_worker_family(family):
+    """
+    Make `family` available to `run_chain` in this process.
+    """
+    global worker_family
+    worker_family = family
+
+
+def run_chain(task):
+    """
+    Returns one block of a sampling chain, given a (method, samples, seed,
+    state) task, as a tuple (scale, genes, traits, weight, state).
+
+    `genes` and `traits` are the weighted sums of each person's gene count
+    distribution and chance of the trait, and `weight` the total weight,
+    all divided by e ** `scale`. `state` is passed to the chain's next block.
+    """
+    method, samples, seed, state = task
+    rng = np.random.default_rng(seed)
+    if method == "likelihood":
+        return worker_family.likelihood_weighting(samples, rng) + (None,)
+    return worker_family.gibbs(max(1, samples // WALKERS), rng, state)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,263 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import pagerank
+from crawler import crawl
+from engine import Transitions, power_iteration
+from outofcore import edge_file_pagerank, write_edges
+from sampler import Sampler, fast_sample_pagerank
+from solvers import solve
+
+DAMPING = 0.85
+
+# Corpus sizes benchmarked, in pages
+SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+
+# Sum of absolute rank changes at which the reference solution stops
+REFERENCE_TOLERANCE = 1e-12
+
+# Average links out of a page that has any
+DEGREE = 8
+
+# Share of pages with no links in the dangling-heavy corpus
+DANGLING_SHARE = 0.8
+
+# Exponent of page popularity in the power-law corpus
+POPULARITY = 1.0
+
+# Samples drawn by the sampling methods, per page in the corpus
+SAMPLES_PER_PAGE = 100
+
+# Largest corpus each slow method is run on; the rest run at every size
+LIMITS = {
+    "crawl": 10000,
+    "pagerank.crawl": 10000,
+    "pagerank.sample": 100,
+    "pagerank.iterate": 1000,
+    "sampler.scalar": 100000,
+}
+
+# Fewest random surfers moving together in the vectorized sampler; large
+# corpora use one surfer per page
+SURFERS = 1024
+
+# Runs of each method, keeping the fastest, while a run is quicker
+# than MIN_SECONDS
+REPEATS = 3
+MIN_SECONDS = 0.1
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [output.json] [max_pages]")
+    output = sys.argv[1] if len(sys.argv) > 1 else "-"
+    max_pages = int(sys.argv[2]) if len(sys.argv) > 2 else SIZES[-1]
+
+    report = run_benchmarks([size for size in SIZES if size <= max_pages], progress=sys.stderr)
+    if output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def run_benchmarks(sizes, kinds=None, damping_factor=DAMPING, seed=0, progress=None):
+    """
+    Returns a report of the time and accuracy of every PageRank method
+    on synthetic corpora of each kind in `kinds` (all by default) and
+    each size in `sizes`, as a JSON-serializable dictionary.
+
+    Each result records the corpus, method, best time in seconds and the
+    L1 distance of the method's ranks from a high-precision reference,
+    or None for methods that do not compute ranks.
+    """
+    results = []
+    for kind in kinds or GENERATORS:
+        for n in sizes:
+            rng = np.random.default_rng([seed, n])
+            sources, targets = GENERATORS[kind](n, rng)
+            for result in benchmark_corpus(n, sources, targets, damping_factor, seed):
+                result = {"corpus": kind, "pages": n, "links": len(sources), **result}
+                results.append(result)
+                if progress is not None:
+                    error = result["l1_error"]
+                    print(f"{kind} {n} {result['method']}: {result['seconds']:.4f}s"
+                          + ("" if error is None else f", L1 error {error:.2e}"), file=progress)
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "damping_factor": damping_factor,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def benchmark_corpus(n, sources, targets, damping_factor, seed):
+    """
+    Yield a result dictionary for each method run on the corpus of `n`
+    pages with the given links.
+    """
+    pages = page_names(n)
+    transitions = Transitions.from_edges(pages, sources, targets)
+    reference = solve(transitions, damping_factor, "jacobi", REFERENCE_TOLERANCE, max_iterations=100000)
+    if not reference.converged:
+        raise RuntimeError(f"reference solution for {n} pages did not converge")
+    corpus = corpus_for(pages, sources, targets)
+    samples = SAMPLES_PER_PAGE * n
+
+    def error(ranks):
+        if isinstance(ranks, dict):
+            ranks = np.fromiter((ranks[page] for page in pages), dtype=float, count=n)
+        return float(np.abs(ranks - reference.ranks).sum())
+
+    methods = {
+        "pagerank.sample": lambda: pagerank.sample_pagerank(corpus, damping_factor, samples),
+        "pagerank.iterate": lambda: pagerank.iterate_pagerank(corpus, damping_factor),
+        "sampler.scalar": lambda: fast_sample_pagerank(corpus, damping_factor, samples, seed=seed),
+        "sampler.surfers": lambda: fast_sample_pagerank(
+            corpus, damping_factor, samples, surfers=max(SURFERS, n), seed=seed
+        ),
+        "engine.matrix": lambda: power_iteration(Transitions.from_corpus(corpus), damping_factor),
+    }
+    for method in ("jacobi", "gauss-seidel", "aitken"):
+        methods[f"solvers.{method}"] = (lambda method=method: solve(transitions, damping_factor, method).ranks)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if n <= max(LIMITS["crawl"], LIMITS["pagerank.crawl"]):
+            write_corpus(directory, pages, sources, targets)
+            for method, function in (("crawl", crawl), ("pagerank.crawl", pagerank.crawl)):
+                if n <= LIMITS[method]:
+                    seconds, _ = best_time(lambda: function(directory))
+                    yield {"method": method, "seconds": seconds, "l1_error": None}
+
+        # Sampler setup is timed separately from sampling itself
+        seconds, _ = best_time(lambda: Sampler(corpus))
+        yield {"method": "sampler.setup", "seconds": seconds, "l1_error": None}
+
+        for method, function in methods.items():
+            if n <= LIMITS.get(method, n):
+                seconds, ranks = best_time(function)
+                result = {"method": method, "seconds": seconds, "l1_error": error(ranks)}
+                if "sample" in method:
+                    result["samples"] = samples
+                yield result
+
+        filename = os.path.join(directory, "edges.bin")
+        order = np.argsort(sources, kind="stable")
+        seconds, _ = best_time(lambda: write_edges(filename, n, [(sources[order], targets[order])]))
+        yield {"method": "outofcore.write", "seconds": seconds, "l1_error": None}
+        seconds, ranks = best_time(lambda: edge_file_pagerank(filename, damping_factor))
+        yield {"method": "outofcore.iterate", "seconds": seconds, "l1_error": error(ranks)}
+
+
+def best_time(function):
+    """
+    Returns a tuple (seconds, value) with the fastest of up to `REPEATS`
+    runs of `function`, and the value of its last run. Runs slower than
+    `MIN_SECONDS` are not repeated.
+    """
+    best = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+        if seconds >= MIN_SECONDS:
+            break
+    return best, value
+
+
+def page_names(n):
+    """
+    Returns the names of `n` pages, whose sorted order is their index order.
+    """
+    width = len(str(n - 1))
+    return [f"{i:0{width}d}.html" for i in range(n)]
+
+
+def corpus_for(pages, sources, targets):
+    """
+    Returns a corpus dictionary, as from `crawl`, holding the given links.
+    """
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def write_corpus(directory, pages, sources, targets):
+    """
+    Writes one HTML file per page into `directory`, holding its links.
+    """
+    order = np.argsort(sources, kind="stable")
+    bounds = np.searchsorted(sources[order], np.arange(len(pages) + 1))
+    ordered = targets[order].tolist()
+    for i, page in enumerate(pages):
+        links = "".join(
+            f"<li><a href=\"{pages[target]}\">{pages[target]}</a></li>\n"
+            for target in ordered[bounds[i]:bounds[i + 1]]
+        )
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<body>\n<h1>{page}</h1>\n<ul>\n{links}</ul>\n</body>\n</html>\n")
+
+
+def power_law_links(n, rng):
+    """
+    Returns (sources, targets) link arrays where out-degrees and the
+    popularity of link targets both follow power laws.
+    """
+    degrees = np.minimum(rng.zipf(2.0, size=n) * DEGREE // 2, n - 1)
+    popularity = np.arange(1, n + 1, dtype=float) ** -POPULARITY
+    rng.shuffle(popularity)
+    sources = np.repeat(np.arange(n), degrees)
+    targets = rng.choice(n, size=len(sources), p=popularity / popularity.sum())
+    return unique_links(n, sources, targets)
+
+
+def chain_links(n, rng):
+    """
+    Returns (sources, targets) link arrays where each page links only to
+    the next, and the last page links nowhere.
+    """
+    sources = np.arange(n - 1)
+    return sources, sources + 1
+
+
+def dangling_links(n, rng):
+    """
+    Returns (sources, targets) link arrays where most pages link nowhere
+    and the rest link to pages chosen uniformly at random.
+    """
+    linking = np.flatnonzero(rng.random(n) >= DANGLING_SHARE)
+    degrees = np.minimum(rng.poisson(DEGREE, size=len(linking)) + 1, n - 1)
+    sources = np.repeat(linking, degrees)
+    targets = rng.integers(n, size=len(sources))
+    return unique_links(n, sources, targets)
+
+
+def unique_links(n, sources, targets):
+    """
+    Returns link arrays without self-links or duplicates, sorted by source.
+    """
+    keys = np.unique(sources.astype(np.int64) * n + targets)
+    sources, targets = keys // n, keys % n
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+GENERATORS = {
+    "power-law": power_law_links,
+    "chain": chain_links,
+    "dangling": dangling_links,
+}
+
+
+if __name__ == "__main__":
+    main()
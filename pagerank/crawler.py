@@ -0,0 +1,266 @@
+import os
+import re
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Same pattern as `crawl`, compiled once and run over raw bytes
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Bytes read from a file at a time
+CHUNK = 1 << 16
+
+# Longest unfinished tag carried over between chunks
+MAX_TAG = 1 << 16
+
+# Files handed to the pool at once, so pending work stays bounded
+BATCH = 1024
+
+# Cache layout: a header holding the magic, version, byte order and the
+# number of pages, names and links, then (mtime, size) per page, the
+# name of each page, name offsets, link offsets per page, link targets
+# as name numbers, and finally the UTF-8 bytes of every name
+CACHE_NAME = "links.cache"
+CACHE_MAGIC = b"LINKGRPH"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<8sI1s3xqqq")
+
+
+def crawl(directory, workers=None, processes=False):
+    """
+    Parse a directory of HTML pages and check for links to other pages.
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page.
+
+    Files are read in chunks across `workers` threads, or processes
+    if `processes` is true.
+    """
+    return dict(iter_links(directory, workers, processes))
+
+
+def iter_links(directory, workers=None, processes=False):
+    """
+    Yield (page, links) pairs for each HTML page in `directory` as soon
+    as it has been parsed, where `links` holds the other pages in the
+    corpus that the page links to.
+    """
+    pages = list_pages(directory)
+    corpus = set(pages)
+    for page, links in parse_pages(directory, pages, workers, processes):
+        yield page, {link for link in links if link in corpus and link != page}
+
+
+def list_pages(directory):
+    """
+    Returns the sorted names of the HTML pages in `directory`.
+    """
+    return sorted(filename for filename in os.listdir(directory) if filename.endswith(".html"))
+
+
+def parse_pages(directory, pages, workers=None, processes=False):
+    """
+    Yield (page, links) pairs for each of `pages` in `directory`, in order,
+    where `links` holds every link target found in the page.
+    """
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(workers) as pool:
+        for start in range(0, len(pages), BATCH):
+            batch = pages[start:start + BATCH]
+            paths = [os.path.join(directory, page) for page in batch]
+            yield from zip(batch, pool.map(file_links, paths, chunksize=16 if processes else 1))
+
+
+def file_links(path):
+    """
+    Returns the set of link targets in an HTML file, reading it a chunk
+    at a time so memory stays bounded however large the file is.
+    """
+    links = set()
+    with open(path, "rb") as f:
+        for link in stream_links(f):
+            links.add(link.decode("utf-8", "replace"))
+    return links
+
+
+def stream_links(f, size=CHUNK):
+    """
+    Yield the href of every link in a binary file, reading `size` bytes
+    at a time. The unfinished tag at the end of each chunk is carried
+    into the next one.
+    """
+    carry = b""
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        buffer = carry + chunk
+        end = 0
+        for match in LINK.finditer(buffer):
+            yield match.group(1)
+            end = match.end()
+
+        start = open_tag(buffer, end)
+        carry = buffer[start:] if len(buffer) - start <= MAX_TAG else b""
+
+
+def open_tag(buffer, start):
+    """
+    Returns the position of the first `<a` tag at or after `start` that
+    more data could still complete into a link, or the end of `buffer`.
+    """
+    while True:
+        start = buffer.find(b"<a", start)
+        if start < 0:
+            return len(buffer) - 1 if buffer.endswith(b"<") else len(buffer)
+        after = start + 2
+        if after == len(buffer) or buffer[after:after + 1].isspace():
+            close = buffer.find(b">", after)
+            href = buffer.find(b"href=\"", after)
+            if close < 0 or 0 <= href < close:
+                return start
+        start = after
+
+
+def cached_crawl(directory, workers=None, processes=False, filename=None):
+    """
+    Return the same dictionary as `crawl`, re-parsing only the pages
+    that changed since the last call, as recorded in a cache file.
+    """
+    corpus, _ = update_cache(directory, workers, processes, filename)
+    return corpus
+
+
+def update_cache(directory, workers=None, processes=False, filename=None):
+    """
+    Bring the link cache for `directory` up to date and return a tuple
+    (corpus, changed), where `corpus` is as returned by `crawl` and
+    `changed` is the set of pages added, removed or re-parsed.
+
+    A page is re-parsed when its size or modification time differs from
+    the cache. The cache is kept in `filename`, by default a file named
+    links.cache inside `directory`.
+    """
+    if filename is None:
+        filename = os.path.join(directory, CACHE_NAME)
+    cached = read_cache(filename)
+
+    # Each entry is ((mtime, size), links) with every link found in the page
+    entries = {}
+    stale = []
+    for page in list_pages(directory):
+        info = os.stat(os.path.join(directory, page))
+        stamp = (info.st_mtime_ns, info.st_size)
+        entry = cached.get(page)
+        if entry is not None and entry[0] == stamp:
+            entries[page] = entry
+        else:
+            entries[page] = (stamp, None)
+            stale.append(page)
+    for page, links in parse_pages(directory, stale, workers, processes):
+        entries[page] = (entries[page][0], links)
+
+    changed = set(stale) | (set(cached) - set(entries))
+    if changed:
+        try:
+            write_cache(filename, entries)
+        except OSError:
+            pass
+
+    corpus = {
+        page: {link for link in links if link in entries and link != page}
+        for page, (_, links) in entries.items()
+    }
+    return corpus, changed
+
+
+def write_cache(filename, entries):
+    """
+    Writes a dictionary of page to ((mtime, size), links) entries to
+    a cache file, replacing any previous one atomically.
+    """
+    numbers = {}
+    names = bytearray()
+    name_offsets = array("q", [0])
+
+    def number(name):
+        if name not in numbers:
+            numbers[name] = len(numbers)
+            names.extend(name.encode("utf-8", "surrogatepass"))
+            name_offsets.append(len(names))
+        return numbers[name]
+
+    stamps = array("q")
+    pages = array("i")
+    link_offsets = array("q", [0])
+    targets = array("i")
+    for page, (stamp, links) in entries.items():
+        stamps.extend(stamp)
+        pages.append(number(page))
+        targets.extend(number(link) for link in sorted(links))
+        link_offsets.append(len(targets))
+
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(CACHE_HEADER.pack(
+                CACHE_MAGIC, CACHE_VERSION, sys.byteorder[0].encode(),
+                len(pages), len(numbers), len(targets)
+            ))
+            for values in (stamps, pages, name_offsets, link_offsets, targets):
+                values.tofile(f)
+            f.write(names)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, filename)
+
+
+def read_cache(filename):
+    """
+    Returns the dictionary of page to ((mtime, size), links) entries
+    stored in a cache file, or an empty one if it is missing or invalid.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+        magic, version, byteorder, n_pages, n_names, n_links = CACHE_HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return {}
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or byteorder != sys.byteorder[0].encode():
+        return {}
+
+    position = CACHE_HEADER.size
+
+    def take(typecode, count):
+        nonlocal position
+        values = array(typecode)
+        values.frombytes(data[position:position + values.itemsize * count])
+        position += values.itemsize * count
+        if len(values) != count:
+            raise ValueError("cache file is truncated")
+        return values
+
+    # A truncated or corrupt file reads as short arrays or offsets that
+    # point past the data, either of which makes the cache invalid
+    try:
+        stamps = take("q", 2 * n_pages)
+        pages = take("i", n_pages)
+        name_offsets = take("q", n_names + 1)
+        link_offsets = take("q", n_pages + 1)
+        targets = take("i", n_links)
+        if position + name_offsets[-1] != len(data):
+            return {}
+        names = [
+            data[position + name_offsets[i]:position + name_offsets[i + 1]].decode("utf-8", "surrogatepass")
+            for i in range(n_names)
+        ]
+        return {
+            names[pages[i]]: (
+                (stamps[2 * i], stamps[2 * i + 1]),
+                {names[targets[j]] for j in range(link_offsets[i], link_offsets[i + 1])}
+            )
+            for i in range(n_pages)
+        }
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return {}
@@ -0,0 +1,244 @@
+import numpy as np
+import scipy.sparse
+
+# Largest change in any page's rank at which iteration stops, as in
+# iterate_pagerank
+TOLERANCE = 0.001
+
+# Upper bound on power iteration sweeps
+MAX_ITERATIONS = 1000
+
+# Personalized PageRank vectors iterated together at once
+BLOCK = 64
+
+
+class Transitions():
+    """
+    Link structure of a corpus as a sparse, column-stochastic matrix.
+
+    `matrix[i, j]` is the chance of following a link from page j to
+    page i, or 0. Pages with no links (`dangling`) have an empty column;
+    their rank is spread evenly over every page as a rank-one correction
+    instead of being stored densely.
+    """
+
+    def __init__(self, pages, matrix, dangling):
+        self.pages = pages
+        self.index = {page: i for i, page in enumerate(pages)}
+        self.matrix = matrix
+        self.dangling = dangling
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the transition matrix for a corpus as returned by `crawl`.
+        Links to pages outside the corpus are ignored.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+
+        sources = []
+        targets = []
+        for page in pages:
+            source = index[page]
+            for link in corpus[page]:
+                target = index.get(link)
+                if target is not None:
+                    sources.append(source)
+                    targets.append(target)
+        return cls.from_edges(pages, np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64))
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build the transition matrix for `pages` from parallel arrays of
+        link source and target indices, without duplicate links.
+        """
+        n = len(pages)
+        out_degree = np.bincount(sources, minlength=n)
+        weights = 1 / out_degree[sources]
+        matrix = scipy.sparse.csr_matrix((weights, (targets, sources)), shape=(n, n))
+        return cls(pages, matrix, out_degree == 0)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def edges(self):
+        """
+        Returns parallel arrays of the source and target index of every link.
+        """
+        links = self.matrix.tocoo()
+        return links.col.astype(np.int64), links.row.astype(np.int64)
+
+    def updated(self, added=(), removed=()):
+        """
+        Returns the transitions after adding and removing (page, link)
+        pairs. Pages first seen in `added` are appended to the corpus.
+        """
+        pages = list(self.pages)
+        index = dict(self.index)
+        for pair in added:
+            for page in pair:
+                if page not in index:
+                    index[page] = len(pages)
+                    pages.append(page)
+
+        n = len(pages)
+        sources, targets = self.edges()
+        keys = sources * n + targets
+        if removed:
+            gone = [
+                index[page] * n + index[link] for page, link in removed
+                if page in index and link in index
+            ]
+            keys = keys[~np.isin(keys, gone)]
+        if added:
+            keys = np.unique(np.concatenate((
+                keys, np.array([index[page] * n + index[link] for page, link in added], dtype=np.int64)
+            )))
+        return Transitions.from_edges(pages, keys // n, keys % n)
+
+    def vector(self, ranks):
+        """
+        Returns a dictionary of ranks as a vector over this corpus' pages,
+        giving pages it lacks an even share and rescaling to sum to 1.
+        """
+        n = len(self.pages)
+        values = np.fromiter((ranks.get(page, 1 / n) for page in self.pages), dtype=float, count=n)
+        return values / values.sum()
+
+    def step(self, ranks, damping_factor, teleport=None):
+        """
+        Returns the ranks after one application of the PageRank update.
+
+        `teleport` is the distribution random jumps land on, uniform by
+        default. Rank on dangling pages is spread the same way.
+        """
+        n = len(self.pages)
+        dangling = ranks[self.dangling].sum(axis=0)
+        updated = self.matrix @ ranks
+        updated *= damping_factor
+        if teleport is None:
+            updated += (damping_factor * dangling + 1 - damping_factor) / n
+        else:
+            updated += (damping_factor * dangling + 1 - damping_factor) * teleport
+        return updated
+
+    def ranks_for(self, values):
+        """
+        Returns a dictionary mapping each page to its value in `values`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, values)}
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE, transitions=None):
+    """
+    Return PageRank values for each page by power iteration over a
+    sparse transition matrix, until no rank changes by more than
+    `tolerance` between sweeps.
+
+    Pass `transitions` to reuse a matrix already built for `corpus`.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    if transitions is None:
+        transitions = Transitions.from_corpus(corpus)
+    ranks = power_iteration(transitions, damping_factor, tolerance)
+    return transitions.ranks_for(ranks)
+
+
+def power_iteration(transitions, damping_factor, tolerance=TOLERANCE, start=None):
+    """
+    Returns the PageRank vector of `transitions`, iterating from `start`
+    (uniform by default) until no rank changes by more than `tolerance`.
+    """
+    n = len(transitions)
+    ranks = np.full(n, 1 / n) if start is None else np.asarray(start, dtype=float)
+    for _ in range(MAX_ITERATIONS):
+        updated = transitions.step(ranks, damping_factor)
+        converged = np.abs(updated - ranks).max() < tolerance
+        ranks = updated
+        if converged:
+            break
+    return ranks
+
+
+def incremental_pagerank(transitions, damping_factor, previous, added=(), removed=(), tolerance=TOLERANCE):
+    """
+    Return PageRank values after adding and removing (page, link) pairs,
+    given the transitions and ranks from before the edit.
+
+    Iteration starts from the previous ranks rather than from 1/N, so
+    small edits converge in a few sweeps.
+
+    Return a tuple (transitions, ranks) holding the updated transitions,
+    for use with the next edit, and a dictionary of PageRank values.
+    """
+    transitions = transitions.updated(added, removed)
+    ranks = power_iteration(transitions, damping_factor, tolerance, transitions.vector(previous))
+    return transitions, transitions.ranks_for(ranks)
+
+
+def personalized_pagerank(transitions, damping_factor, seeds, tolerance=TOLERANCE, block=BLOCK):
+    """
+    Return personalized PageRank values for every entry of `seeds`, as an
+    array with one row per page of `transitions` and one column per entry.
+
+    Each entry is either a collection of pages, teleported to evenly, or
+    a dictionary of page weights. Random jumps and the rank of dangling
+    pages go to the entry's pages instead of the whole corpus.
+
+    Columns are iterated together `block` at a time, so every sweep is
+    one sparse matrix times dense block product. Teleport vectors stay
+    sparse, and a column leaves its block once none of its values change
+    by more than `tolerance`.
+    """
+    teleports = teleport_matrix(transitions, seeds)
+    damped = (damping_factor * transitions.matrix).tocsr()
+    ranks = np.empty(teleports.shape)
+    for start in range(0, teleports.shape[1], block):
+        columns = np.arange(start, min(start + block, teleports.shape[1]))
+        teleport = teleports[:, columns].tocoo()
+        values = teleport.toarray()
+        for _ in range(MAX_ITERATIONS):
+            jumps = damping_factor * values[transitions.dangling].sum(axis=0) + 1 - damping_factor
+            updated = damped @ values
+            updated[teleport.row, teleport.col] += jumps[teleport.col] * teleport.data
+
+            np.subtract(values, updated, out=values)
+            np.abs(values, out=values)
+            done = values.max(axis=0) < tolerance
+            values = updated
+            if done.any():
+                ranks[:, columns[done]] = values[:, done]
+                columns = columns[~done]
+                if len(columns) == 0:
+                    break
+                values = np.ascontiguousarray(values[:, ~done])
+                teleport = teleports[:, columns].tocoo()
+        else:
+            ranks[:, columns] = values
+    return ranks
+
+
+def teleport_matrix(transitions, seeds):
+    """
+    Returns a sparse matrix with one column per entry of `seeds`, holding
+    its teleport distribution over the pages of `transitions`.
+    """
+    rows = []
+    columns = []
+    weights = []
+    for column, seed in enumerate(seeds):
+        if not isinstance(seed, dict):
+            seed = dict.fromkeys(seed, 1)
+        total = sum(seed.values())
+        if total <= 0:
+            raise ValueError(f"seed {column} has no weight")
+        for page, weight in seed.items():
+            rows.append(transitions.index[page])
+            columns.append(column)
+            weights.append(weight / total)
+    return scipy.sparse.csc_matrix((weights, (rows, columns)), shape=(len(transitions), len(seeds)))
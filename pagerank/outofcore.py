@@ -0,0 +1,157 @@
+import os
+import struct
+import sys
+
+import numpy as np
+
+from crawler import iter_links, list_pages
+
+DAMPING = 0.85
+
+# Largest change in any page's rank at which iteration stops
+TOLERANCE = 1e-8
+
+# Upper bound on sweeps over the edge file
+MAX_ITERATIONS = 1000
+
+# Edges, and pages, read from the file at a time
+BLOCK = 1 << 22
+
+# Edge file layout: a header holding the magic, version and the number
+# of pages and edges, then each page's out-degree as int32, then every
+# edge as an int32 (source, target) pair, sorted by source
+EDGES_MAGIC = b"EDGELIST"
+EDGES_VERSION = 1
+EDGES_HEADER = struct.Struct("<8sI4xqq")
+
+# Pages printed by main
+TOP = 20
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python outofcore.py corpus [edges]")
+    directory = sys.argv[1]
+    filename = sys.argv[2] if len(sys.argv) == 3 else os.path.join(directory, "edges.bin")
+
+    pages = write_corpus_edges(directory, filename)
+    ranks = edge_file_pagerank(filename, DAMPING)
+    print(f"PageRank Results from {filename} ({len(pages)} pages)")
+    for i in np.argsort(-ranks, kind="stable")[:TOP]:
+        print(f"  {pages[i]}: {ranks[i]:.4f}")
+
+
+def write_corpus_edges(directory, filename):
+    """
+    Crawl the HTML pages in `directory` straight into an edge file,
+    one page at a time, and return the list of page names. Pages are
+    numbered by their position in that list.
+    """
+    pages = list_pages(directory)
+    index = {page: i for i, page in enumerate(pages)}
+
+    def blocks():
+        sources = []
+        targets = []
+        for page, links in iter_links(directory):
+            source = index[page]
+            for link in sorted(links, key=index.get):
+                sources.append(source)
+                targets.append(index[link])
+            if len(sources) >= BLOCK:
+                yield sources, targets
+                sources, targets = [], []
+        yield sources, targets
+
+    write_edges(filename, len(pages), blocks())
+    return pages
+
+
+def write_edges(filename, n_pages, blocks):
+    """
+    Write an edge file for `n_pages` pages from an iterable of
+    (sources, targets) blocks, whose edges must be sorted by source.
+    The file is replaced atomically.
+    """
+    degrees = np.zeros(n_pages, dtype=np.int32)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    edges = 0
+    last = -1
+    try:
+        with open(temporary, "wb") as f:
+            f.write(EDGES_HEADER.pack(EDGES_MAGIC, EDGES_VERSION, n_pages, 0))
+            f.write(degrees.tobytes())
+            for sources, targets in blocks:
+                pairs = np.column_stack((
+                    np.asarray(sources, dtype=np.int32), np.asarray(targets, dtype=np.int32)
+                ))
+                if len(pairs) == 0:
+                    continue
+                if pairs[0, 0] < last or (np.diff(pairs[:, 0]) < 0).any():
+                    raise ValueError("edges must be sorted by source")
+                last = pairs[-1, 0]
+                degrees += np.bincount(pairs[:, 0], minlength=n_pages).astype(np.int32)
+                f.write(pairs.tobytes())
+                edges += len(pairs)
+
+            f.seek(0)
+            f.write(EDGES_HEADER.pack(EDGES_MAGIC, EDGES_VERSION, n_pages, edges))
+            f.write(degrees.tobytes())
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, filename)
+
+
+def open_edges(filename):
+    """
+    Returns (degrees, edges) memory-mapped from an edge file, where
+    `edges` has one (source, target) row per link.
+    """
+    with open(filename, "rb") as f:
+        magic, version, n_pages, n_edges = EDGES_HEADER.unpack(f.read(EDGES_HEADER.size))
+    if magic != EDGES_MAGIC or version != EDGES_VERSION:
+        raise ValueError(f"{filename} is not an edge file")
+    degrees = np.memmap(filename, dtype=np.int32, mode="r", offset=EDGES_HEADER.size, shape=(n_pages,))
+    edges = np.memmap(
+        filename, dtype=np.int32, mode="r",
+        offset=EDGES_HEADER.size + 4 * n_pages, shape=(n_edges, 2)
+    )
+    return degrees, edges
+
+
+def edge_file_pagerank(filename, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return the PageRank vector of the graph in an edge file, streaming
+    over its memory-mapped edges `BLOCK` at a time on every sweep.
+
+    Only the current and next rank vectors are held in memory. Iteration
+    stops once no rank changes by more than `tolerance`.
+    """
+    degrees, edges = open_edges(filename)
+    n = len(degrees)
+    ranks = np.full(n, 1 / n)
+    updated = np.empty(n)
+    for _ in range(max_iterations):
+        dangling = 0.0
+        for start in range(0, n, BLOCK):
+            block = degrees[start:start + BLOCK]
+            dangling += ranks[start:start + BLOCK][block == 0].sum()
+        updated.fill((damping_factor * dangling + 1 - damping_factor) / n)
+
+        for start in range(0, len(edges), BLOCK):
+            block = np.asarray(edges[start:start + BLOCK])
+            sources = block[:, 0]
+            np.add.at(updated, block[:, 1], damping_factor * ranks[sources] / degrees[sources])
+
+        change = 0.0
+        for start in range(0, n, BLOCK):
+            change = max(change, np.abs(updated[start:start + BLOCK] - ranks[start:start + BLOCK]).max())
+        ranks, updated = updated, ranks
+        if change < tolerance:
+            break
+    return ranks
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import re
 import sys
 import copy
 
+from crawler import cached_crawl
+
 DAMPING = 0.85
 SAMPLES = 10000
 
@@ -11,7 +13,9 @@ SAMPLES = 10000
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+
+    # Only pages changed since the last run are parsed again
+    corpus = cached_crawl(sys.argv[1])
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -0,0 +1,218 @@
+import multiprocessing
+import random
+
+import numpy as np
+
+# Samples each chain draws between convergence checks
+BLOCK = 10000
+
+# Largest number of samples each chain may draw
+MAX_SAMPLES = 1000000
+
+# Sampler shared with chain worker processes
+worker_sampler = None
+
+
+class Sampler():
+    """
+    Random surfer over a corpus with every page's links precomputed.
+
+    Each step flips a coin weighted by the damping factor, then picks
+    uniformly either among the current page's links or among all pages,
+    so it costs O(1) however large the corpus is. Uniform picks need no
+    alias table: every link out of a page is equally likely.
+    """
+
+    def __init__(self, corpus):
+        self.pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(self.pages)}
+
+        # links[i] holds the indices linked to by page i, as a tuple for
+        # scalar sampling and as a slice of `targets` for vectorized sampling
+        self.links = [
+            tuple(sorted(index[link] for link in corpus[page] if link in index))
+            for page in self.pages
+        ]
+        self.out_degree = np.fromiter((len(links) for links in self.links), dtype=np.int64, count=len(self.links))
+        self.offsets = np.concatenate(([0], np.cumsum(self.out_degree)))
+        self.targets = np.fromiter(
+            (target for links in self.links for target in links),
+            dtype=np.int64, count=int(self.offsets[-1])
+        )
+
+    def counts(self, damping_factor, n, rng=random):
+        """
+        Returns how many of `n` samples of a single surfer, starting at a
+        page chosen at random, landed on each page index.
+        """
+        counts, _ = self.walk(damping_factor, n, rng)
+        return counts
+
+    def walk(self, damping_factor, n, rng=random, start=None):
+        """
+        Returns how many of `n` samples of a single surfer landed on each
+        page index, and the index of the last page sampled.
+
+        The first sample is a page chosen at random or, when continuing a
+        walk, the page one transition on from `start`, so `start` itself
+        is not counted again.
+        """
+        links = self.links
+        pages = len(self.pages)
+        if start is None:
+            page = rng.randrange(pages)
+            visits = [page]
+        else:
+            page = start
+            visits = []
+        for _ in range(n - len(visits)):
+            outgoing = links[page]
+            if outgoing and rng.random() < damping_factor:
+                page = outgoing[rng.randrange(len(outgoing))]
+            else:
+                page = rng.randrange(pages)
+            visits.append(page)
+        return np.bincount(visits, minlength=pages), page
+
+    def surfer_counts(self, damping_factor, n, surfers, rng=None):
+        """
+        Returns how many of `n` samples landed on each page index, with
+        `surfers` independent surfers moving in lockstep as NumPy arrays.
+        Each surfer starts at a page chosen at random.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        pages = len(self.pages)
+        counts = np.zeros(pages, dtype=np.int64)
+        position = rng.integers(pages, size=surfers)
+        remaining = n
+        while remaining > 0:
+            if remaining < surfers:
+                position = position[:remaining]
+            counts += np.bincount(position, minlength=pages)
+            remaining -= len(position)
+
+            degree = self.out_degree[position]
+            follow = (rng.random(len(position)) < damping_factor) & (degree > 0)
+            following = position[follow]
+            pick = self.offsets[following] + (rng.random(len(following)) * degree[follow]).astype(np.int64)
+            position = rng.integers(pages, size=len(position))
+            position[follow] = self.targets[pick]
+        return counts
+
+    def ranks_for(self, counts):
+        """
+        Returns a dictionary mapping each page to its share of `counts`.
+        """
+        total = counts.sum()
+        return {page: float(count / total) for page, count in zip(self.pages, counts)}
+
+
+def fast_sample_pagerank(corpus, damping_factor, n, surfers=None, seed=None, sampler=None):
+    """
+    Return PageRank values for each page by sampling `n` pages
+    according to transition model, starting with a page at random.
+
+    With `surfers`, that many random surfers share the `n` samples and
+    move together as NumPy arrays. Pass `sampler` to reuse the links
+    already precomputed for `corpus`.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    if sampler is None:
+        sampler = Sampler(corpus)
+    if surfers is None:
+        counts = sampler.counts(damping_factor, n, random.Random(seed))
+    else:
+        counts = sampler.surfer_counts(damping_factor, n, surfers, np.random.default_rng(seed))
+    return sampler.ranks_for(counts)
+
+
+def chain_pagerank(corpus, damping_factor, chains=4, precision=None,
+                   block=BLOCK, max_samples=MAX_SAMPLES, processes=None, seed=None):
+    """
+    Return PageRank estimates from `chains` independent random surfers
+    run across a process pool, with the standard error of each estimate.
+
+    Every chain draws `block` samples at a time, continuing from where it
+    stopped, with its own seed derived from `seed`. Sampling stops once
+    every page's standard error is below `precision`, or once each chain
+    has drawn `max_samples`, which must be at least one block. Without
+    `precision`, each chain draws exactly one block.
+
+    Return a tuple (ranks, errors, samples) where `ranks` and `errors`
+    are dictionaries keyed by page name and `samples` is the total number
+    of samples drawn.
+    """
+    if chains < 2 and precision is not None:
+        raise ValueError("at least two chains are needed to estimate precision")
+    if max_samples < block:
+        raise ValueError("max_samples must be at least one block")
+    sampler = Sampler(corpus)
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    counts = np.zeros((chains, len(sampler.pages)), dtype=np.int64)
+    positions = [None] * chains
+
+    if processes == 1:
+        pool = None
+        set_worker_sampler(sampler)
+    else:
+        pool = multiprocessing.Pool(processes, initializer=set_worker_sampler, initargs=(sampler,))
+    try:
+        drawn = 0
+        while drawn < max_samples:
+            tasks = [
+                (damping_factor, block, int(chain_seed.spawn(1)[0].generate_state(1)[0]), position)
+                for chain_seed, position in zip(seeds, positions)
+            ]
+            results = map(run_chain, tasks) if pool is None else pool.map(run_chain, tasks)
+            for chain, (chain_counts, position) in enumerate(results):
+                counts[chain] += chain_counts
+                positions[chain] = position
+            drawn += block
+
+            errors = standard_errors(counts)
+            if precision is None or errors.max() < precision:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    totals = counts.sum(axis=0)
+    return (
+        sampler.ranks_for(totals),
+        {page: float(error) for page, error in zip(sampler.pages, errors)},
+        int(totals.sum())
+    )
+
+
+def standard_errors(counts):
+    """
+    Returns the standard error of each page's overall estimate, given
+    per-chain visit counts as rows, from the spread between chains.
+    """
+    chains = counts.shape[0]
+    if chains < 2:
+        return np.full(counts.shape[1], np.inf)
+    estimates = counts / counts.sum(axis=1, keepdims=True)
+    return estimates.std(axis=0, ddof=1) / np.sqrt(chains)
+
+
+def set_worker_sampler(sampler):
+    """
+    Make `sampler` available to `run_chain` in this process.
+    """
+    global worker_sampler
+    worker_sampler = sampler
+
+
+def run_chain(task):
+    """
+    Returns the counts and last page of one block of a chain, given a
+    (damping_factor, samples, seed, start) task.
+    """
+    damping_factor, samples, seed, start = task
+    return worker_sampler.walk(damping_factor, samples, random.Random(seed), start)
@@ -0,0 +1,165 @@
+import sys
+import time
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+from crawler import crawl
+from engine import Transitions
+
+DAMPING = 0.85
+
+# Sum of absolute rank changes in one sweep at which iteration stops
+TOLERANCE = 1e-6
+
+# Upper bound on sweeps before giving up on convergence
+MAX_ITERATIONS = 1000
+
+# Sweeps between Aitken extrapolations
+EXTRAPOLATION_PERIOD = 10
+
+METHODS = ("jacobi", "gauss-seidel", "aitken")
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python solvers.py corpus [tolerance]")
+    tolerance = float(sys.argv[2]) if len(sys.argv) == 3 else TOLERANCE
+    transitions = Transitions.from_corpus(crawl(sys.argv[1]))
+    print(f"{len(transitions)} pages, {transitions.matrix.nnz} links")
+    for method in METHODS:
+        solution = solve(transitions, DAMPING, method, tolerance)
+        status = "converged" if solution.converged else "did not converge"
+        print(f"  {method}: {status} after {solution.iterations} iterations, "
+              f"residual {solution.residuals[-1]:.2e}, {solution.seconds * 1000:.1f} ms")
+
+
+class Solution():
+    """
+    PageRank vector found by a solver, with how it got there.
+    """
+
+    def __init__(self, method, ranks, residuals, seconds, converged):
+        self.method = method
+        self.ranks = ranks
+
+        # L1 norm of the change made by each sweep, in order
+        self.residuals = residuals
+        self.iterations = len(residuals)
+        self.seconds = seconds
+        self.converged = converged
+
+
+def solve(transitions, damping_factor, method="jacobi", tolerance=TOLERANCE,
+          max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Returns the Solution found by `method` for `transitions`, iterating
+    from `start` (uniform by default) until a sweep changes the ranks by
+    less than `tolerance` in L1 norm, or for at most `max_iterations`.
+
+    Methods are "jacobi" (plain power iteration), "gauss-seidel" (each
+    page's update uses ranks already updated in the same sweep) and
+    "aitken" (power iteration with periodic Aitken extrapolation).
+    """
+    if method == "jacobi":
+        sweep = jacobi_sweep(transitions, damping_factor)
+    elif method == "gauss-seidel":
+        sweep = gauss_seidel_sweep(transitions, damping_factor)
+    elif method == "aitken":
+        sweep = aitken_sweep(transitions, damping_factor)
+    else:
+        raise ValueError(f"unknown method {method!r}, expected one of {', '.join(METHODS)}")
+
+    n = len(transitions)
+    ranks = np.full(n, 1 / n) if start is None else np.asarray(start, dtype=float)
+    residuals = []
+    started = time.perf_counter()
+    converged = False
+    for _ in range(max_iterations):
+        updated = sweep(ranks)
+        residuals.append(float(np.abs(updated - ranks).sum()))
+        ranks = updated
+        if residuals[-1] < tolerance:
+            converged = True
+            break
+    return Solution(method, ranks, residuals, time.perf_counter() - started, converged)
+
+
+def solve_pagerank(corpus, damping_factor, method="jacobi", tolerance=TOLERANCE,
+                   max_iterations=MAX_ITERATIONS):
+    """
+    Return a tuple (ranks, solution) where `ranks` is a dictionary of
+    PageRank values for each page of `corpus`, as from iterate_pagerank,
+    and `solution` reports how `method` reached them.
+    """
+    transitions = Transitions.from_corpus(corpus)
+    solution = solve(transitions, damping_factor, method, tolerance, max_iterations)
+    return transitions.ranks_for(solution.ranks), solution
+
+
+def jacobi_sweep(transitions, damping_factor):
+    """
+    Returns a function applying one power iteration step.
+    """
+    def sweep(ranks):
+        return transitions.step(ranks, damping_factor)
+    return sweep
+
+
+def gauss_seidel_sweep(transitions, damping_factor):
+    """
+    Returns a function applying one Gauss-Seidel sweep in page order.
+
+    Splitting the damped link matrix into its lower triangle L and the
+    rest U, each sweep solves (I - L) x' = U x + c, where c is the
+    teleport and dangling mass of the current ranks, by one sparse
+    triangular solve. Ranks are rescaled to sum to 1 afterwards.
+    """
+    n = len(transitions)
+    damped = damping_factor * transitions.matrix
+    lower = (scipy.sparse.identity(n, format="csr") - scipy.sparse.tril(damped, format="csr")).tocsr()
+    upper = scipy.sparse.triu(damped, k=1, format="csr")
+
+    def sweep(ranks):
+        constant = damping_factor * ranks[transitions.dangling].sum() / n + (1 - damping_factor) / n
+        updated = scipy.sparse.linalg.spsolve_triangular(lower, upper @ ranks + constant, lower=True)
+        return updated / updated.sum()
+    return sweep
+
+
+def aitken_sweep(transitions, damping_factor, period=EXTRAPOLATION_PERIOD):
+    """
+    Returns a function applying one power iteration step, replacing
+    every `period`-th result with its Aitken delta-squared extrapolation
+    from the last three iterates.
+
+    Extrapolation is skipped if it would make any rank negative.
+    """
+    history = []
+    sweeps = 0
+
+    def sweep(ranks):
+        nonlocal sweeps
+        sweeps += 1
+        updated = transitions.step(ranks, damping_factor)
+        history.append(ranks)
+        del history[:-2]
+        if len(history) < 2 or sweeps % period:
+            return updated
+
+        older, previous = history
+        step = updated - previous
+        curvature = step - (previous - older)
+        usable = np.abs(curvature) > 1e-15
+        extrapolated = updated.copy()
+        extrapolated[usable] -= step[usable] ** 2 / curvature[usable]
+        if (extrapolated < 0).any():
+            return updated
+        return extrapolated / extrapolated.sum()
+
+    return sweep
+
+
+if __name__ == "__main__":
+    main()